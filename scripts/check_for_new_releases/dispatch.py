@@ -0,0 +1,144 @@
+import json
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Optional
+
+from scripts.shell_explorer.helpers import write_file_atomically
+
+if TYPE_CHECKING:
+    from github.Workflow import Workflow
+
+# GitHub limits the whole workflow_dispatch payload to 65535 characters, the
+# rest is left for the other inputs
+MAX_INPUT_SIZE = 60000
+IN_FLIGHT_STATUSES = ("queued", "in_progress")
+DEBOUNCE = timedelta(0)
+MAX_DELAY = timedelta(hours=2)
+# dispatched releases are remembered for a while, so the releases found again
+# by an overlapping check are not explored twice
+DISPATCHED_TTL = timedelta(days=1)
+
+
+def chunk_releases(
+    new_releases: dict[str, list[int]], max_size: int = MAX_INPUT_SIZE
+) -> list[dict[str, list[int]]]:
+    # splits new releases into dicts which JSON is not longer than max_size,
+    # releases of one repo are split too if there are too many of them
+    chunks = []
+    chunk: dict[str, list[int]] = {}
+    size = len("{}")
+    for name, release_ids in new_releases.items():
+        key_size = len(json.dumps(name)) + len(": []")
+        for release_id in release_ids:
+            if name in chunk:
+                added = len(f", {release_id}")
+            else:
+                added = key_size + len(str(release_id)) + (len(", ") if chunk else 0)
+            if chunk and size + added > max_size:
+                chunks.append(chunk)
+                chunk, size = {}, len("{}")
+                added = key_size + len(str(release_id))
+            chunk.setdefault(name, []).append(release_id)
+            size += added
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def is_run_in_flight(workflow: "Workflow") -> bool:
+    for status in IN_FLIGHT_STATUSES:
+        if next(iter(workflow.get_runs(status=status)), None):
+            return True
+    return False
+
+
+class DispatchQueue:
+    # new releases waiting for the dispatch and recently dispatched ones, kept
+    # between checks in a JSON file; without the file releases are dispatched
+    # right away
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self.pending: dict[str, list[int]] = {}
+        self.first_seen: Optional[datetime] = None
+        self.last_seen: Optional[datetime] = None
+        self._dispatched: dict[str, datetime] = {}
+        self._load()
+
+    @property
+    def persistent(self) -> bool:
+        return bool(self._path)
+
+    def _load(self):
+        if not self._path:
+            return
+        try:
+            with open(self._path) as fo:
+                data = json.load(fo)
+            pending = data["pending"]
+            first_seen = data["first_seen"] and datetime.fromisoformat(
+                data["first_seen"]
+            )
+            last_seen = data["last_seen"] and datetime.fromisoformat(data["last_seen"])
+            dispatched = {
+                release_id: datetime.fromisoformat(dispatched_at)
+                for release_id, dispatched_at in data["dispatched"].items()
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        self.pending = pending
+        self.first_seen, self.last_seen = first_seen, last_seen
+        self._dispatched = dispatched
+
+    def save(self):
+        if not self._path:
+            return
+        data = {
+            "pending": self.pending,
+            "first_seen": self.first_seen and self.first_seen.isoformat(),
+            "last_seen": self.last_seen and self.last_seen.isoformat(),
+            "dispatched": {
+                release_id: dispatched_at.isoformat()
+                for release_id, dispatched_at in self._dispatched.items()
+            },
+        }
+        write_file_atomically(self._path, json.dumps(data))
+
+    def add(self, new_releases: dict[str, list[int]], now: datetime) -> int:
+        # returns the number of releases neither pending nor dispatched before
+        self._dispatched = {
+            release_id: dispatched_at
+            for release_id, dispatched_at in self._dispatched.items()
+            if now - dispatched_at < DISPATCHED_TTL
+        }
+        added = 0
+        for name, release_ids in new_releases.items():
+            pending = self.pending.get(name, [])
+            for release_id in release_ids:
+                if release_id in pending or str(release_id) in self._dispatched:
+                    continue
+                pending.append(release_id)
+                added += 1
+            if pending:
+                self.pending[name] = pending
+        if added:
+            self.first_seen = self.first_seen or now
+            self.last_seen = now
+        return added
+
+    def is_settled(self, now: datetime, debounce: timedelta) -> bool:
+        # no new releases came during the debounce window
+        return not self.persistent or now - self.last_seen >= debounce
+
+    def is_overdue(self, now: datetime, max_delay: timedelta) -> bool:
+        return not self.persistent or now - self.first_seen >= max_delay
+
+    def mark_dispatched(self, releases: dict[str, list[int]], now: datetime):
+        for name, release_ids in releases.items():
+            for release_id in release_ids:
+                self._dispatched[str(release_id)] = now
+            pending = [i for i in self.pending.get(name, []) if i not in release_ids]
+            if pending:
+                self.pending[name] = pending
+            else:
+                self.pending.pop(name, None)
+        if not self.pending:
+            self.first_seen = self.last_seen = None
@@ -1,17 +1,42 @@
+import asyncio
 import json
+import logging
 import sys
-from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional, Sequence
 
 from github import Github, UnknownObjectException
 
+from scripts.check_for_new_releases.dispatch import (
+    DEBOUNCE,
+    MAX_DELAY,
+    DispatchQueue,
+    chunk_releases,
+    is_run_in_flight,
+)
+from scripts.shell_explorer.helpers import (
+    EXPLORE_ORGS,
+    configure_logging,
+    release_key,
+    write_file_atomically,
+)
+from scripts.shell_explorer.http_cache import ResponseCache
+from scripts.shell_explorer.rate_limit import RequestScheduler
+from scripts.shell_explorer.tracing import Tracer, trace_repo
+from scripts.shell_explorer.transport import (
+    AsyncRunner,
+    connection_class,
+    install_connection,
+)
+
 if TYPE_CHECKING:
     from github import Organization, Repository
 
+ORG_LOGIN = "QualiSystems"
 REPO_NAME = "Shell-Explorer"
 WORKFLOW_FILE_NAME = "check-for-new-releases.yml"
 SHELL_EXPLORER_WORKFLOW_FILE_NAME = "shell-explorer.yml"
+WATERMARK_OVERLAP = timedelta(minutes=5)
 
 
 def get_time_of_last_run(repo: "Repository") -> datetime:
@@ -21,39 +46,182 @@ def get_time_of_last_run(repo: "Repository") -> datetime:
     except (UnknownObjectException, StopIteration):
         return datetime(2021, 1, 1)
     else:
-        return last_run.created_at - timedelta(minutes=5)
+        return last_run.created_at - WATERMARK_OVERLAP
 
 
-def get_last_releases(
-    org: "Organization", check_from: datetime
-) -> dict[str, list[int]]:
-    new_releases = defaultdict(list)
-    for repo in org.get_repos():
+def read_watermark(path: Optional[str]) -> Optional[datetime]:
+    if not path:
+        return None
+    try:
+        with open(path) as fo:
+            return datetime.fromisoformat(fo.read().strip()) - WATERMARK_OVERLAP
+    except (OSError, ValueError):
+        return None
+
+
+def write_watermark(path: str, checked_at: datetime):
+    write_file_atomically(path, checked_at.isoformat())
+
+
+def get_pushed_repos(org: "Organization", check_from: datetime) -> list["Repository"]:
+    # a new release pushes a tag, so repos pushed before check_from have no new
+    # releases, and the most recently pushed repos come first
+    repos = []
+    for repo in org.get_repos(sort="pushed", direction="desc"):
+        if repo.pushed_at and repo.pushed_at < check_from:
+            break
+        repos.append(repo)
+    return repos
+
+
+def get_new_release_ids(repo: "Repository", check_from: datetime) -> list[int]:
+    release_ids = []
+    with trace_repo(repo.name):
         for release in repo.get_releases():
             if release.published_at and release.published_at >= check_from:
-                new_releases[repo.name].append(release.id)
+                release_ids.append(release.id)
             else:
                 break
-    return new_releases
+    return release_ids
 
 
-def run_shell_explorer_workflow(repo: "Repository", new_releases: dict[str, list[int]]):
+async def get_last_releases_async(
+    org: "Organization", check_from: datetime, runner: AsyncRunner
+) -> dict[str, list[int]]:
+    repos = await runner.call(get_pushed_repos, org, check_from)
+    # releases of the pushed repos are checked concurrently
+    release_ids = await asyncio.gather(
+        *(runner.call(get_new_release_ids, repo, check_from) for repo in repos)
+    )
+    return {repo.name: ids for repo, ids in zip(repos, release_ids) if ids}
+
+
+def get_last_releases(
+    org: "Organization", check_from: datetime, runner: Optional[AsyncRunner] = None
+) -> dict[str, list[int]]:
+    return asyncio.run(
+        get_last_releases_async(org, check_from, runner or AsyncRunner())
+    )
+
+
+def has_repo(org: "Organization", name: str) -> bool:
+    try:
+        org.get_repo(name)
+    except UnknownObjectException:
+        return False
+    return True
+
+
+async def get_orgs_last_releases_async(
+    orgs: Sequence["Organization"], check_from: datetime, runner: AsyncRunner
+) -> dict[str, list[int]]:
+    # the orgs are checked concurrently with the same runner, so they share
+    # the workers and the rate limit budget
+    releases = await asyncio.gather(
+        *(get_last_releases_async(org, check_from, runner) for org in orgs)
+    )
+    merged = {}
+    for position, (org, org_releases) in enumerate(zip(orgs, releases)):
+        for name, release_ids in org_releases.items():
+            # a name is explored in the first org that has it, the earlier
+            # orgs may have it without new releases
+            found = await asyncio.gather(
+                *(runner.call(has_repo, earlier, name) for earlier in orgs[:position])
+            )
+            owners = [earlier.login for earlier, has in zip(orgs, found) if has]
+            if owners:
+                logging.warning(f"Skip {org.login}/{name}, explored in {owners[0]}")
+                continue
+            merged[release_key(org.login, name, orgs[0].login)] = release_ids
+    return merged
+
+
+def get_orgs_last_releases(
+    orgs: Sequence["Organization"],
+    check_from: datetime,
+    runner: Optional[AsyncRunner] = None,
+) -> dict[str, list[int]]:
+    return asyncio.run(
+        get_orgs_last_releases_async(orgs, check_from, runner or AsyncRunner())
+    )
+
+
+def run_shell_explorer_workflow(
+    repo: "Repository",
+    queue: DispatchQueue,
+    now: datetime,
+    debounce: timedelta = DEBOUNCE,
+    max_delay: timedelta = MAX_DELAY,
+):
+    # pending releases wait until no new ones came for the debounce window,
+    # but not longer than max_delay, and until no Shell Explorer run is in
+    # flight, as concurrent runs race on the branch commit
+    if not queue.pending:
+        return
+    if not queue.is_overdue(now, max_delay) and not queue.is_settled(now, debounce):
+        logging.info("Wait for more new releases before the dispatch")
+        return
     workflow = repo.get_workflow(SHELL_EXPLORER_WORKFLOW_FILE_NAME)
-    data = json.dumps(new_releases)
-    workflow.create_dispatch("master", {"new_releases": data})
+    if queue.persistent and is_run_in_flight(workflow):
+        logging.info("Shell Explorer is running, the dispatch is postponed")
+        return
+    chunks = chunk_releases(queue.pending)
+    if queue.persistent:
+        # one run per check, the rest of releases wait in the queue;
+        # without the pending file they can't wait, so all chunks are sent
+        chunks = chunks[:1]
+    for chunk in chunks:
+        workflow.create_dispatch("master", {"new_releases": json.dumps(chunk)})
+        queue.mark_dispatched(chunk, now)
 
 
-def main(token: str):
+def main(
+    token: str,
+    cache_dir: Optional[str] = None,
+    trace_file: Optional[str] = None,
+    watermark_file: Optional[str] = None,
+    workers: int = 1,
+    pending_file: Optional[str] = None,
+    debounce: timedelta = DEBOUNCE,
+    max_delay: timedelta = MAX_DELAY,
+    orgs: Sequence[str] = EXPLORE_ORGS,
+):
+    cache = ResponseCache(cache_dir) if cache_dir else None
+    scheduler = RequestScheduler()
+    tracer = Tracer()
     client = Github(token)
-    org = client.get_organization("QualiSystems")
-    repo = org.get_repo(REPO_NAME)
-    check_from = get_time_of_last_run(repo)
-    releases = get_last_releases(org, check_from)
-    if releases:
-        run_shell_explorer_workflow(repo, releases)
+    install_connection(client, connection_class(cache, workers, scheduler, tracer))
+    with scheduler.use_phase("last-run"):
+        # orgs are looked up by login
+        explored_orgs = [client.get_organization(login) for login in orgs]
+        repo = client.get_organization(ORG_LOGIN).get_repo(REPO_NAME)
+        # the workflow history is used only when the watermark is lost
+        check_from = read_watermark(watermark_file) or get_time_of_last_run(repo)
+    logging.info(f"Check for releases published since {check_from}")
+    checked_at = datetime.utcnow()
+    with scheduler.use_phase("releases"):
+        releases = get_orgs_last_releases(
+            explored_orgs, check_from, AsyncRunner(workers)
+        )
+    queue = DispatchQueue(pending_file)
+    queue.add(releases, checked_at)
+    try:
+        with scheduler.use_phase("dispatch"):
+            run_shell_explorer_workflow(repo, queue, checked_at, debounce, max_delay)
+    finally:
+        queue.save()
+    if watermark_file:
+        write_watermark(watermark_file, checked_at)
+    scheduler.log_report()
+    if cache:
+        cache.log_stats()
+    tracer.log_summary()
+    if trace_file:
+        tracer.dump(trace_file)
 
 
 def run_from_cmd():
+    configure_logging()
     token = sys.argv[1]
     main(token)
 
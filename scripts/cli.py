@@ -1,12 +1,31 @@
+import json
+from datetime import timedelta
+
 import click
 
-from scripts.check_for_new_releases.main import main as check_for_new_releases
-from scripts.shell_explorer.shell_explorer import ShellExplorer
+from scripts.check_for_new_releases.dispatch import DEBOUNCE as DISPATCH_DEBOUNCE
+from scripts.check_for_new_releases.dispatch import MAX_DELAY as DISPATCH_MAX_DELAY
+from scripts.shell_explorer.helpers import EXPLORE_ORGS, configure_logging
+from scripts.shell_explorer.webhooks import DEBOUNCE, MAX_DELAY
+
+# commands import what they need when they run, so the CLI starts without
+# PyGithub, PyYAML and packaging, e.g. for --help
+
+
+def org_option(help_text: str):
+    return click.option(
+        "--org",
+        "orgs",
+        multiple=True,
+        default=EXPLORE_ORGS,
+        show_default=True,
+        help=help_text,
+    )
 
 
 @click.group()
 def cli():
-    pass
+    configure_logging()
 
 
 @cli.command("explore")
@@ -16,10 +35,109 @@ def cli():
     "--new-releases",
     required=False,
     default="{}",
-    help="Json dict of repositories and release ids. {<repo_name>: [<release_id1>]}",
+    help="Json dict of repositories and release ids. {<repo_name>: [<release_id1>]}, "
+    "repositories of other than the first --org are <org login>/<repo_name>",
+)
+@org_option("Login of an organization to explore, can be repeated")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of concurrent GitHub requests",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for the GitHub response cache",
+)
+@click.option(
+    "--backend",
+    type=click.Choice(["rest", "graphql", "mirror"]),
+    default="rest",
+    show_default=True,
+    help="GitHub API or local mirrors used to explore the organization repositories",
+)
+@click.option(
+    "--mirror-dir",
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory with bare mirrors of the organization repositories, <name>.git, "
+    "in <org login> subdirectories for several organizations",
+)
+@click.option(
+    "--rescan-all",
+    is_flag=True,
+    help="Explore all repositories, even unchanged since the last scan",
 )
-def trigger_auto_tests(auth_key: str, branch: str, new_releases: str):
-    se = ShellExplorer(auth_key, branch, new_releases)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False),
+    help="JSON file for the trace of all GitHub calls",
+)
+@click.option(
+    "--layout",
+    type=click.Choice(["single", "sharded"]),
+    default="single",
+    show_default=True,
+    help="Keep every repository in its own file too, only changed ones are updated",
+)
+@click.option(
+    "--checkpoint-file",
+    type=click.Path(dir_okay=False),
+    help="File for the progress of a full scan, saved periodically",
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    help="Continue the full scan from --checkpoint-file",
+)
+@click.option(
+    "--inspect",
+    type=click.Choice(["contents", "archive"]),
+    default="contents",
+    show_default=True,
+    help="Read release files with the contents API or from the release tarball",
+)
+def trigger_auto_tests(
+    auth_key: str,
+    branch: str,
+    new_releases: str,
+    workers: int,
+    cache_dir: str,
+    backend: str,
+    mirror_dir: str,
+    rescan_all: bool,
+    trace_file: str,
+    layout: str,
+    checkpoint_file: str,
+    resume: bool,
+    inspect: str,
+    orgs: tuple[str, ...],
+):
+    if resume and not checkpoint_file:
+        raise click.UsageError("--resume needs --checkpoint-file")
+    if inspect == "archive" and backend != "rest":
+        raise click.UsageError(f"The {backend} backend prefetches release files")
+    if (backend == "mirror") != bool(mirror_dir):
+        raise click.UsageError("--mirror-dir is used with the mirror backend")
+    from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+    se = ShellExplorer(
+        auth_key,
+        branch,
+        new_releases,
+        workers=workers,
+        cache_dir=cache_dir,
+        backend=backend,
+        rescan_all=rescan_all,
+        trace_file=trace_file,
+        layout=layout,
+        checkpoint_file=checkpoint_file,
+        resume=resume,
+        inspect=inspect,
+        mirror_dir=mirror_dir,
+        orgs=orgs,
+    )
     se.scan_and_commit()
 
 
@@ -28,8 +146,132 @@ def trigger_auto_tests(auth_key: str, branch: str, new_releases: str):
     help="Looks for new releases and triggers GA for ShellExplorer",
 )
 @click.option("--auth-key", required=True)
-def check_new_releases(auth_key: str):
-    check_for_new_releases(auth_key)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for the GitHub response cache",
+)
+@click.option(
+    "--trace-file",
+    type=click.Path(dir_okay=False),
+    help="JSON file for the trace of all GitHub calls",
+)
+@click.option(
+    "--watermark-file",
+    type=click.Path(dir_okay=False),
+    help="File with the time of the last check, used instead of the workflow runs",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of concurrent GitHub requests",
+)
+@click.option(
+    "--pending-file",
+    type=click.Path(dir_okay=False),
+    help="File with releases waiting for the dispatch and recently dispatched ones",
+)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=DISPATCH_DEBOUNCE.total_seconds() / 60,
+    show_default=True,
+    help="Minutes without new releases before they are dispatched, "
+    "needs --pending-file",
+)
+@click.option(
+    "--max-delay",
+    type=click.FloatRange(min=0),
+    default=DISPATCH_MAX_DELAY.total_seconds() / 60,
+    show_default=True,
+    help="Maximum minutes a release waits for the dispatch",
+)
+@org_option("Login of an organization to check, can be repeated")
+def check_new_releases(
+    auth_key: str,
+    cache_dir: str,
+    trace_file: str,
+    watermark_file: str,
+    workers: int,
+    pending_file: str,
+    debounce: float,
+    max_delay: float,
+    orgs: tuple[str, ...],
+):
+    from scripts.check_for_new_releases.main import main as check_for_new_releases
+
+    check_for_new_releases(
+        auth_key,
+        cache_dir,
+        trace_file,
+        watermark_file,
+        workers,
+        pending_file,
+        timedelta(minutes=debounce),
+        timedelta(minutes=max_delay),
+        orgs,
+    )
+
+
+@cli.command(
+    "serve-webhooks",
+    help="Receives GitHub release webhooks and explores new releases",
+)
+@click.option("--auth-key", required=True)
+@click.option("--secret", required=True, envvar="SHELL_EXPLORER_WEBHOOK_SECRET")
+@click.option("--branch", required=True, default="dev")
+@click.option("--host", default="0.0.0.0", show_default=True)
+@click.option("--port", type=int, default=8080, show_default=True)
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=DEBOUNCE / 60,
+    show_default=True,
+    help="Minutes without new releases before they are explored in one commit",
+)
+@click.option(
+    "--max-delay",
+    type=click.FloatRange(min=0),
+    default=MAX_DELAY / 60,
+    show_default=True,
+    help="Maximum minutes a release waits for the batch",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for the GitHub response cache",
+)
+@org_option("Login of an organization which releases are explored, can be repeated")
+def serve_webhooks(
+    auth_key: str,
+    secret: str,
+    branch: str,
+    host: str,
+    port: int,
+    debounce: float,
+    max_delay: float,
+    cache_dir: str,
+    orgs: tuple[str, ...],
+):
+    from scripts.shell_explorer.shell_explorer import ShellExplorer
+    from scripts.shell_explorer.webhooks import ReleaseBatcher, WebhookServer
+
+    def explore(new_releases):
+        se = ShellExplorer(
+            auth_key, branch, json.dumps(new_releases), cache_dir=cache_dir, orgs=orgs
+        )
+        # the server runs for long, so the worker threads of every batch are
+        # stopped and its explorer is dropped
+        try:
+            se.scan_and_commit()
+        finally:
+            se.close()
+
+    # the batcher waits in seconds
+    batcher = ReleaseBatcher(explore, debounce * 60, max_delay * 60)
+    WebhookServer((host, port), secret, batcher, orgs).serve()
 
 
 if __name__ == "__main__":
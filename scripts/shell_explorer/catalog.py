@@ -0,0 +1,121 @@
+import json
+from datetime import datetime
+from typing import BinaryIO, Iterable, Optional
+
+from scripts.shell_explorer.entities import RELEASE_FIELDS, REPO_CLASSES, Release, Repo
+
+# catalog.jsonl: the first line is a header with the byte offset and length of
+# every repo line counted from the end of the header, each next line is one repo
+# with its releases, so a consumer reads only the header and the lines it needs;
+# releases are stored as lists of RELEASE_FIELDS values
+VERSION = 1
+REPO_CLASSES_BY_TAG = {repo_class.yaml_tag: repo_class for repo_class in REPO_CLASSES}
+
+
+def _release_record(release: Release) -> list:
+    record = [getattr(release, field) for field in RELEASE_FIELDS]
+    if release.published_at:
+        record[2] = release.published_at.isoformat()
+    return record
+
+
+def _repo_record(repo: Repo) -> dict:
+    return {
+        "type": repo.yaml_tag,
+        "name": repo.name,
+        "url": repo.url,
+        "releases": [_release_record(release) for release in repo.releases],
+    }
+
+
+def dump_catalog_line(repo: Repo) -> str:
+    return json.dumps(_repo_record(repo), separators=(",", ":")) + "\n"
+
+
+def dump_catalog(repos: Iterable[Repo]) -> str:
+    return join_catalog((repo.name, dump_catalog_line(repo)) for repo in repos)
+
+
+def join_catalog(lines: Iterable[tuple[str, str]]) -> str:
+    # builds the catalog from repo names and their lines in the catalog order
+    body = []
+    index = {}
+    offset = 0
+    for name, line in lines:
+        length = len(line.encode("utf-8"))
+        index[name] = [offset, length]
+        offset += length
+        body.append(line)
+    header = json.dumps(
+        {"version": VERSION, "release_fields": RELEASE_FIELDS, "index": index},
+        separators=(",", ":"),
+    )
+    return "".join([header, "\n", *body])
+
+
+def split_catalog(data: str) -> dict[str, str]:
+    # repo lines of a catalog by the repo name, without parsing them
+    header, _, body = data.encode("utf-8").partition(b"\n")
+    index = json.loads(header)["index"]
+    return {
+        name: body[offset : offset + length].decode("utf-8")
+        for name, (offset, length) in index.items()
+    }
+
+
+def _load_release(record: list) -> Release:
+    title, tag_name, published_at, release_url, python_version = record
+    if published_at:
+        published_at = datetime.fromisoformat(published_at)
+    return Release(title, tag_name, published_at, release_url, python_version)
+
+
+def _load_repo(record: dict) -> Repo:
+    repo_class = REPO_CLASSES_BY_TAG[record["type"]]
+    releases = [_load_release(release) for release in record["releases"]]
+    return repo_class(record["name"], record["url"], releases)
+
+
+class Catalog:
+    # reads single repos from catalog.jsonl without loading the rest of it
+    def __init__(self, fo: BinaryIO):
+        self._fo = fo
+        header = json.loads(fo.readline())
+        if header.get("version") != VERSION:
+            raise ValueError(f"Unsupported catalog version {header.get('version')}")
+        self._index: dict[str, list[int]] = header["index"]
+        self._body = fo.tell()
+
+    @classmethod
+    def from_path(cls, path) -> "Catalog":
+        return cls(open(path, "rb"))
+
+    def close(self):
+        self._fo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def names(self) -> list[str]:
+        return list(self._index)
+
+    def get(self, name: str) -> Optional[Repo]:
+        try:
+            offset, length = self._index[name]
+        except KeyError:
+            return None
+        self._fo.seek(self._body + offset)
+        return _load_repo(json.loads(self._fo.read(length)))
+
+    def releases(self, name: str) -> list[Release]:
+        repo = self.get(name)
+        return repo.releases if repo else []
@@ -0,0 +1,87 @@
+import json
+from typing import Callable, Optional
+
+from scripts.shell_explorer.entities import Release, Repo
+
+# the change feed is a directory of JSON lines segments named by the sequence
+# number of their first record and an index.json with the segments; every
+# record is one added repo or release with a sequence number one greater than
+# the previous record, so a consumer keeps the last number it processed and
+# reads only the segments after it; the oldest segments are removed when there
+# are more than MAX_SEGMENTS
+VERSION = 1
+SEGMENT_SIZE = 1000
+MAX_SEGMENTS = 50
+
+
+def _release_record(repo: Repo, release: Release) -> dict:
+    return {
+        "event": "release",
+        "name": repo.name,
+        "type": repo.yaml_tag,
+        "title": release.title,
+        "tag_name": release.tag_name,
+        "published_at": release.published_at and release.published_at.isoformat(),
+        "python_version": release.python_version,
+        "release_url": release.release_url,
+    }
+
+
+def change_records(repo: Repo, previous_releases: Optional[list[Release]]) -> list:
+    # records of the repo if it's new (previous_releases is None) and of its
+    # releases missing in previous_releases, the oldest release first
+    records = []
+    if previous_releases is None:
+        records.append(
+            {"event": "repo", "name": repo.name, "type": repo.yaml_tag, "url": repo.url}
+        )
+        previous_releases = []
+    for release in reversed(repo.releases):
+        if release not in previous_releases:
+            records.append(_release_record(repo, release))
+    return records
+
+
+class ChangeFeed:
+    def __init__(self, index_path: str, index: Optional[str] = None):
+        self.index_path = index_path
+        self.directory = index_path.rpartition("/")[0]
+        self.segments: list[dict] = json.loads(index)["segments"] if index else []
+
+    def _segment_path(self, seq: int) -> str:
+        return f"{self.directory}/{seq:010d}.jsonl"
+
+    @staticmethod
+    def _is_full(segment: dict) -> bool:
+        return segment["last"] - segment["first"] + 1 >= SEGMENT_SIZE
+
+    def dump_index(self) -> str:
+        return json.dumps({"version": VERSION, "segments": self.segments}, indent=2)
+
+    def append(
+        self, records: list[dict], read_segment: Callable[[str], str]
+    ) -> dict[str, Optional[str]]:
+        # returns the new content of changed files, None for removed segments
+        segment = self.segments[-1] if self.segments else None
+        contents: dict[str, list[str]] = {}
+        if segment and not self._is_full(segment):
+            contents[segment["path"]] = [read_segment(segment["path"])]
+        seq = segment["last"] if segment else 0
+        for record in records:
+            seq += 1
+            if not segment or self._is_full(segment):
+                segment = {"path": self._segment_path(seq), "first": seq, "last": seq}
+                self.segments.append(segment)
+                contents[segment["path"]] = []
+            record = {"seq": seq, **record}
+            contents[segment["path"]].append(
+                json.dumps(record, separators=(",", ":")) + "\n"
+            )
+            segment["last"] = seq
+        files: dict[str, Optional[str]] = {
+            path: "".join(lines) for path, lines in contents.items()
+        }
+        while len(self.segments) > MAX_SEGMENTS:
+            files[self.segments.pop(0)["path"]] = None
+        files[self.index_path] = self.dump_index()
+        return files
@@ -0,0 +1,65 @@
+import logging
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+from scripts.shell_explorer.entities import Repo
+from scripts.shell_explorer.helpers import write_file_atomically
+from scripts.shell_explorer.operations import SerializationOperations
+
+# bump when the content of the checkpoint changes
+VERSION = 2
+
+
+class ScanCheckpoint:
+    # progress of a full scan: the position in the org listing, the repos
+    # changed so far with their change feed records and the scan state, so a
+    # failed scan continues from there; a checkpoint of another branch, layout
+    # or kind of scan is not used
+    def __init__(self, path: str, scan: dict):
+        self._path = Path(path)
+        self._scan = scan
+
+    def load(self) -> Optional[dict]:
+        try:
+            data = SerializationOperations.load_table(
+                self._path.read_text(encoding="utf-8")
+            )
+        except OSError:
+            return None
+        except yaml.YAMLError:
+            logging.warning(f"Invalid scan checkpoint {self._path}")
+            return None
+        if not isinstance(data, dict) or data.get("version") != VERSION:
+            logging.warning(f"Unsupported scan checkpoint {self._path}")
+            return None
+        if data.get("scan") != self._scan:
+            logging.warning(f"Scan checkpoint {self._path} is for {data.get('scan')}")
+            return None
+        return data
+
+    def save(
+        self,
+        position: int,
+        last_repo: str,
+        repos: list[Repo],
+        scan_state: dict[str, dict],
+        changes: list[dict],
+    ):
+        data = {
+            "version": VERSION,
+            "scan": self._scan,
+            "position": position,
+            "last_repo": last_repo,
+            "repos": sorted(repos),
+            "scan_state": scan_state,
+            "changes": changes,
+        }
+        write_file_atomically(self._path, SerializationOperations.dump_table(data))
+
+    def remove(self):
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,11 +1,22 @@
 import functools
+import sys
 
 import yaml
 
+# the order of fields in dumped tables and catalog records
+RELEASE_FIELDS = ("title", "tag_name", "published_at", "release_url", "python_version")
+
+
+def _intern(value):
+    # a few distinct values are repeated in every release
+    return sys.intern(value) if isinstance(value, str) else value
+
 
 @functools.total_ordering
 class Release(yaml.YAMLObject):
     yaml_tag = "!Release"
+    # no __dict__ per release, YAML state goes through __getstate__/__setstate__
+    __slots__ = RELEASE_FIELDS
 
     def __init__(
         self, title, tag_name, published_at=None, release_url=None, python_version=None
@@ -14,13 +25,19 @@ class Release(yaml.YAMLObject):
         self.tag_name = tag_name
         self.published_at = published_at
         self.release_url = release_url
-        self.python_version = python_version
+        self.python_version = _intern(python_version)
+
+    def __getstate__(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
 
     def match_str(self):
         return self.title + self.tag_name
 
     def __hash__(self):
-        return hash(self.match_str())
+        return hash((self.title, self.tag_name))
 
     def __eq__(self, other: "Release"):
         return self.title == other.title and self.tag_name == other.tag_name
@@ -38,14 +55,32 @@ class Release(yaml.YAMLObject):
 @functools.total_ordering
 class Repo(yaml.YAMLObject):
     yaml_tag = "!Repository"
+    __slots__ = ("name", "url", "_releases", "changed")
 
     def __init__(self, name, url=None, releases=None):
         self.name = name
         self.url = url
-        self.releases = releases or []
+        self._releases = releases or []
+        # set when the releases are replaced, so only changed tables are saved
+        self.changed = False
+
+    @property
+    def releases(self) -> list[Release]:
+        return self._releases
+
+    @releases.setter
+    def releases(self, releases: list[Release]):
+        self._releases = releases
+        self.changed = True
+
+    def __getstate__(self):
+        return {"name": self.name, "url": self.url, "releases": self._releases}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
 
     def __hash__(self):
-        return hash(self.yaml_tag) | hash(self.name)
+        return hash((self.yaml_tag, self.name))
 
     def __eq__(self, other: "Repo"):
         return self.yaml_tag == other.yaml_tag and self.name == other.name
@@ -66,19 +101,27 @@ class Repo(yaml.YAMLObject):
 
 class Shell(Repo):
     yaml_tag = "!Shell"
+    __slots__ = ()
 
 
 class ShellL1(Repo):
     yaml_tag = "!Shell_L1"
+    __slots__ = ()
 
 
 class Shell1G(Repo):
     yaml_tag = "!Shell_1G"
+    __slots__ = ()
 
 
 class Shell2G(Repo):
     yaml_tag = "!Shell_2G"
+    __slots__ = ()
 
 
 class Package(Repo):
     yaml_tag = "!Package"
+    __slots__ = ()
+
+
+REPO_CLASSES = (Repo, Shell, ShellL1, Shell1G, Shell2G, Package)
@@ -0,0 +1,204 @@
+from datetime import datetime
+from typing import Optional
+
+from github import GithubException, UnknownObjectException
+
+from scripts.shell_explorer.operations import RepoOperations
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+RELEASE_FILES = {"setupPy": "setup.py", "metadata": "src/drivermetadata.xml"}
+
+REPOS_QUERY = """
+query($org: String!, $first: Int!, $after: String, $releases: Int!) {
+  organization(login: $org) {
+    repositories(first: $first, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        url
+        pushedAt
+        object(expression: "HEAD:") { ... on Tree { oid entries { name } } }
+        releases(first: $releases, orderBy: {field: CREATED_AT, direction: DESC}) {
+          nodes {
+            databaseId
+            name
+            tagName
+            publishedAt
+            url
+            tagCommit {
+              setupPy: file(path: "setup.py") {
+                object { ... on Blob { oid text } }
+              }
+              metadata: file(path: "src/drivermetadata.xml") {
+                object { ... on Blob { oid text } }
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if value:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ")
+
+
+class ReleaseSnapshot:
+    # the part of github.GitRelease used by ShellExplorer
+    def __init__(self, release_id, title, tag_name, published_at, html_url):
+        self.id = release_id
+        self.title = title
+        self.tag_name = tag_name
+        self.published_at = published_at
+        self.html_url = html_url
+
+
+class ContentSnapshot:
+    # the part of github.ContentFile used by ShellExplorer
+    def __init__(self, name: str, sha: Optional[str] = None, text: str = ""):
+        self.name = name
+        self.path = name
+        self.sha = sha
+        self.decoded_content = text.encode("utf-8")
+
+
+class TreeSnapshot:
+    # the part of github.GitTree used by ShellExplorer
+    def __init__(self, sha: Optional[str], entries: list[ContentSnapshot]):
+        self.sha = sha
+        self.tree = entries
+
+
+class RepoSnapshot:
+    # read only repository with prefetched releases, root entries and
+    # release files, mimics the part of github.Repository used by ShellExplorer
+    default_branch = "HEAD"
+
+    def __init__(
+        self,
+        name: str,
+        html_url: str,
+        pushed_at: Optional[datetime],
+        releases: list[ReleaseSnapshot],
+        root: list[str],
+        files: dict[tuple[str, str], ContentSnapshot],
+        root_sha: Optional[str] = None,
+    ):
+        self.name = name
+        self.html_url = html_url
+        self.pushed_at = pushed_at
+        self._releases = releases
+        self._root = root
+        self._files = files
+        self._root_sha = root_sha
+
+    def get_releases(self):
+        return list(self._releases)
+
+    def get_release(self, release_id):
+        for release in self._releases:
+            if release.id == int(release_id):
+                return release
+        raise UnknownObjectException(404, {"message": "Not Found"}, {})
+
+    def get_contents(self, path, ref=None):
+        path = path.strip("/")
+        if not path:
+            return [ContentSnapshot(name) for name in self._root]
+        try:
+            return self._files[(path, ref)]
+        except KeyError:
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+
+    def get_git_tree(self, sha, recursive=False):
+        if sha != self.default_branch:
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+        return TreeSnapshot(self._root_sha, self.get_contents(""))
+
+
+class GraphQLRepoOperations(RepoOperations):
+    BATCH_SIZE = 25
+    # drafts are listed among the releases, so more releases are fetched to
+    # keep releases_depth published ones, as the REST listing does
+    RELEASES_OVERFETCH = 2
+
+    def __init__(
+        self,
+        auth_key,
+        *args,
+        releases_depth: int = 5,
+        graphql_url: str = GRAPHQL_URL,
+        **kwargs,
+    ):
+        super().__init__(auth_key, *args, **kwargs)
+        self._auth_key = auth_key
+        self._releases_depth = releases_depth
+        self._graphql_url = graphql_url
+
+    def _query(self, query: str, variables: dict) -> dict:
+        r = self.connection.send(
+            "POST",
+            self._graphql_url,
+            json={"query": query, "variables": variables},
+            headers={"Authorization": f"bearer {self._auth_key}"},
+        )
+        data = r.json()
+        if r.status_code != 200 or data.get("errors"):
+            raise GithubException(r.status_code, data, dict(r.headers))
+        return data["data"]
+
+    def _repo_snapshot(self, node: dict) -> RepoSnapshot:
+        releases = []
+        files = {}
+        for release in node["releases"]["nodes"]:
+            if not release["publishedAt"]:
+                continue
+            if len(releases) == self._releases_depth:
+                break
+            releases.append(
+                ReleaseSnapshot(
+                    release["databaseId"],
+                    release["name"],
+                    release["tagName"],
+                    _parse_datetime(release["publishedAt"]),
+                    release["url"],
+                )
+            )
+            tag_commit = release.get("tagCommit") or {}
+            for alias, path in RELEASE_FILES.items():
+                blob = (tag_commit.get(alias) or {}).get("object")
+                if blob and blob.get("text") is not None:
+                    files[(path, release["tagName"])] = ContentSnapshot(
+                        path.rsplit("/", 1)[-1], blob["oid"], blob["text"]
+                    )
+        tree = node.get("object") or {}
+        root = [entry["name"] for entry in tree.get("entries", [])]
+        return RepoSnapshot(
+            node["name"],
+            node["url"],
+            _parse_datetime(node.get("pushedAt")),
+            releases,
+            root,
+            files,
+            tree.get("oid"),
+        )
+
+    def get_org_repos(self, org_login: str):
+        variables = {
+            "org": org_login,
+            "first": self.BATCH_SIZE,
+            "after": None,
+            "releases": self._releases_depth * self.RELEASES_OVERFETCH,
+        }
+        while True:
+            data = self._query(REPOS_QUERY, variables)
+            repositories = data["organization"]["repositories"]
+            for node in repositories["nodes"]:
+                yield self._repo_snapshot(node)
+            if not repositories["pageInfo"]["hasNextPage"]:
+                break
+            variables["after"] = repositories["pageInfo"]["endCursor"]
@@ -1,9 +1,15 @@
 import enum
+import hashlib
+import logging
+import os
 import re
-from typing import Optional
+import sys
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
 
-from github.ContentFile import ContentFile
-from packaging.specifiers import SpecifierSet
+if TYPE_CHECKING:
+    from github.ContentFile import ContentFile
 
 PYTHON_REQUIRES_PATTERN = re.compile(
     r"python_requires\s*=\s*(\(?(\s*['\"].+?['\"]\s*)+\)?)", re.DOTALL
@@ -17,6 +23,19 @@ class PyVersion(enum.Enum):
 
 
 DEFAULT_PY_VERSION = PyVersion.PY2
+# organizations explored by default, the first one has the working repo
+EXPLORE_ORGS = ("QualiSystems",)
+
+
+def configure_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        stream=sys.stdout,
+        format=(
+            "%(asctime)s [%(levelname)s]: %(name)s %(module)s - %(funcName)-20s "
+            "%(message)s"
+        ),
+    )
 
 
 def get_python_requires_str(setup_content: str) -> Optional[str]:
@@ -32,6 +51,7 @@ def get_package_python_version(setup_content: str) -> PyVersion:
     python_requires = get_python_requires_str(setup_content)
     if not python_requires:
         return DEFAULT_PY_VERSION
+    from packaging.specifiers import SpecifierSet
 
     py2_set = {"2.7"}
     py3_set = {"3.7", "3.8", "3.9", "3.10"}
@@ -51,3 +71,31 @@ def get_package_python_version(setup_content: str) -> PyVersion:
 
 def get_str_from_git_content(content: "ContentFile") -> str:
     return content.decoded_content.decode("utf-8")
+
+
+def write_file_atomically(path, data: str):
+    # readers see the old or the new content, never a partly written file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(data, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def git_blob_sha(data: str) -> str:
+    content = data.encode("utf-8")
+    header = f"blob {len(content)}\0".encode()
+    return hashlib.sha1(header + content).hexdigest()
+
+
+# new releases are keyed by the repo name in the default (first) org and by
+# <org login>/<repo name> in the other orgs; logins are case insensitive
+def release_key(org_login: str, repo_name: str, default_org: str) -> str:
+    if org_login.lower() == default_org.lower():
+        return repo_name
+    return f"{org_login}/{repo_name}"
+
+
+def split_release_key(key: str, default_org: str) -> tuple[str, str]:
+    org_login, _, repo_name = key.rpartition("/")
+    return org_login or default_org, repo_name
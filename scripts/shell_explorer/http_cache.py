@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Optional
+
+from scripts.shell_explorer.helpers import write_file_atomically
+
+DEFAULT_MAX_SIZE = 200 * 1024 * 1024
+# entries are kept apart from other files in the cache directory, e.g. the
+# watermark, so only they are counted and evicted
+ENTRIES_DIR = "responses"
+
+
+class CachedResponse:
+    # mimic the httplib response object, same as github.Requester.RequestsResponse
+    def __init__(self, status: int, headers: dict[str, str], text: str):
+        self.status = status
+        self.headers = headers
+        self.text = text
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get("last-modified")
+
+    def validators(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def getheaders(self):
+        return self.headers.items()
+
+    def read(self) -> str:
+        return self.text
+
+
+class ResponseCache:
+    # on-disk cache of GET responses revalidated with ETag/Last-Modified,
+    # least recently used entries are removed when it grows above max_size
+    def __init__(self, path, max_size: int = DEFAULT_MAX_SIZE):
+        self._path = Path(path) / ENTRIES_DIR
+        self._path.mkdir(parents=True, exist_ok=True)
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._size = sum(f.stat().st_size for f in self._path.glob("*.json"))
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url: str, headers: dict[str, str]) -> str:
+        # responses depend on the token, so it's a part of the key
+        parts = (url, headers.get("Authorization", ""), headers.get("Accept", ""))
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._path / f"{key}.json"
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        path = self._entry_path(key)
+        try:
+            with path.open(encoding="utf-8") as fo:
+                data = json.load(fo)
+            path.touch()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(data["status"], data["headers"], data["text"])
+
+    def put(self, key: str, response: CachedResponse):
+        if not response.etag and not response.last_modified:
+            return
+        path = self._entry_path(key)
+        data = json.dumps(
+            {
+                "status": response.status,
+                "headers": response.headers,
+                "text": response.text,
+            }
+        )
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            write_file_atomically(path, data)
+            self._size += path.stat().st_size - old_size
+            if self._size > self._max_size:
+                self._evict()
+
+    def _evict(self):
+        entries = sorted(self._path.glob("*.json"), key=lambda f: f.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self._max_size:
+                break
+            size = entry.stat().st_size
+            entry.unlink(missing_ok=True)
+            self._size -= size
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def record_hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def log_stats(self):
+        logging.info(
+            f"Response cache: {self.hits} hits, {self.misses} misses, "
+            f"{self._size} bytes"
+        )
@@ -0,0 +1,147 @@
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from scripts.shell_explorer.graphql_operations import (
+    RELEASE_FILES,
+    ContentSnapshot,
+    ReleaseSnapshot,
+    RepoSnapshot,
+)
+from scripts.shell_explorer.operations import RepoOperations
+
+MIRROR_SUFFIX = ".git"
+TAG_FORMAT = "%(refname:strip=2)%00%(objectname)%00%(creatordate:unix)"
+
+
+class GitMirror:
+    # bare repository read with the git CLI
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name[: -len(MIRROR_SUFFIX)]
+
+    def _git(self, *args: str, stdin: bytes = b"") -> bytes:
+        return subprocess.run(
+            ["git", "--git-dir", str(self.path), *args],
+            input=stdin,
+            capture_output=True,
+            check=True,
+        ).stdout
+
+    def pushed_at(self) -> Optional[datetime]:
+        # the newest commit or tag stands for the time of the last push
+        date = self._git(
+            "for-each-ref",
+            "--sort=-creatordate",
+            "--count=1",
+            "--format=%(creatordate:unix)",
+        ).strip()
+        return datetime.utcfromtimestamp(int(date)) if date else None
+
+    def tags(self) -> list[tuple[str, str, datetime]]:
+        # names, object shas and dates of the tags, the newest first
+        output = self._git(
+            "for-each-ref", "--sort=-creatordate", f"--format={TAG_FORMAT}", "refs/tags"
+        )
+        tags = []
+        for line in output.decode("utf-8").splitlines():
+            name, sha, date = line.split("\0")
+            tags.append((name, sha, datetime.utcfromtimestamp(int(date))))
+        return tags
+
+    def root(self) -> tuple[Optional[str], list[str]]:
+        # sha and entry names of the root tree of the default branch
+        try:
+            sha = self._git("rev-parse", "--verify", "-q", "HEAD^{tree}")
+        except subprocess.CalledProcessError:  # empty repository
+            return None, []
+        sha = sha.decode().strip()
+        names = self._git("ls-tree", "--name-only", "-z", sha).decode("utf-8")
+        names = names.split("\0")
+        return sha, [name for name in names if name]
+
+    def blobs(self, objects: list[str]) -> dict[str, tuple[str, str]]:
+        # sha and text of blobs like <tag>:<path>, looked up by one git process;
+        # missing objects are left out
+        output = self._git(
+            "cat-file",
+            "--batch",
+            stdin="".join(f"{obj}\n" for obj in objects).encode("utf-8"),
+        )
+        blobs = {}
+        position = 0
+        for obj in objects:
+            # <sha> <type> <size>\n<content>\n or <object> missing\n
+            end = output.index(b"\n", position)
+            header = output[position:end].decode().split()
+            position = end + 1
+            if header[-1] == "missing":
+                continue
+            sha, object_type, size = header[0], header[1], int(header[2])
+            if object_type == "blob":
+                content = output[position : position + size]
+                blobs[obj] = sha, content.decode("utf-8")
+            position += size + 1
+        return blobs
+
+
+class MirrorRepoOperations(RepoOperations):
+    # explores bare mirrors of the org repos in a local directory, tags are
+    # releases; the working repo is still read and updated through the API
+    RELEASE_TITLES = False
+
+    def __init__(
+        self,
+        auth_key,
+        *args,
+        mirror_dir: str,
+        releases_depth: int = 5,
+        root_org: Optional[str] = None,
+        **kwargs,
+    ):
+        super().__init__(auth_key, *args, **kwargs)
+        self._mirror_dir = Path(mirror_dir)
+        self._releases_depth = releases_depth
+        # the org which mirrors can be kept in mirror_dir itself
+        self._root_org = root_org or self._org_login
+
+    def _repo_snapshot(self, mirror: GitMirror, org_login: str) -> RepoSnapshot:
+        html_url = f"https://github.com/{org_login}/{mirror.name}"
+        releases = [
+            ReleaseSnapshot(
+                sha, name, name, published_at, f"{html_url}/releases/tag/{name}"
+            )
+            for name, sha, published_at in mirror.tags()
+        ]
+        objects = {
+            f"refs/tags/{release.tag_name}:{path}": (path, release.tag_name)
+            for release in releases[: self._releases_depth]
+            for path in RELEASE_FILES.values()
+        }
+        files = {}
+        for obj, (sha, text) in mirror.blobs(list(objects)).items():
+            path, tag_name = objects[obj]
+            files[(path, tag_name)] = ContentSnapshot(
+                path.rsplit("/", 1)[-1], sha, text
+            )
+        root_sha, root = mirror.root()
+        return RepoSnapshot(
+            mirror.name, html_url, mirror.pushed_at(), releases, root, files, root_sha
+        )
+
+    def _org_mirror_dir(self, org_login: str) -> Path:
+        # mirrors of several orgs are kept in <mirror_dir>/<org login>, only the
+        # first org can use mirror_dir itself, so other orgs don't list its repos
+        org_dir = self._mirror_dir / org_login
+        if org_dir.is_dir():
+            return org_dir
+        if org_login.lower() != self._root_org.lower():
+            raise FileNotFoundError(f"No mirrors of {org_login} in {org_dir}")
+        return self._mirror_dir
+
+    def get_org_repos(self, org_login: str):
+        mirror_dir = self._org_mirror_dir(org_login)
+        for path in sorted(mirror_dir.glob(f"*{MIRROR_SUFFIX}")):
+            if path.is_dir():
+                yield self._repo_snapshot(GitMirror(path), org_login)
@@ -1,62 +1,238 @@
 import logging
+import re
+import tarfile
 from datetime import datetime
-from functools import cached_property, lru_cache
+from functools import cached_property, partial
+from typing import Iterable, Optional
 
 import yaml
-from github import Github, Organization, Repository
+from github import Github, InputGitTreeElement, Organization, Repository
 
-from scripts.shell_explorer.helpers import get_str_from_git_content
+from scripts.shell_explorer.entities import RELEASE_FIELDS, REPO_CLASSES, Release, Repo
+from scripts.shell_explorer.helpers import get_str_from_git_content, git_blob_sha
+from scripts.shell_explorer.http_cache import ResponseCache
+from scripts.shell_explorer.rate_limit import RequestScheduler
+from scripts.shell_explorer.tracing import Tracer
+from scripts.shell_explorer.transport import (
+    AsyncRunner,
+    connection_class,
+    install_connection,
+)
+
+try:
+    from yaml import CDumper as _BaseDumper
+    from yaml import CLoader as _BaseLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import Dumper as _BaseDumper
+    from yaml import Loader as _BaseLoader
 
 
 class RepoOperations:
-    def __init__(self, auth_key, org_name, working_repo):
+    # the releases have their own titles and URLs, not only tags
+    RELEASE_TITLES = True
+
+    def __init__(
+        self,
+        auth_key,
+        org_login,
+        working_repo,
+        cache: Optional[ResponseCache] = None,
+        pool_size: Optional[int] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        tracer: Optional[Tracer] = None,
+    ):
+        self.cache = cache
+        self.scheduler = scheduler or RequestScheduler()
+        self.tracer = tracer or Tracer()
+        self.connection = connection_class(
+            cache, pool_size, self.scheduler, self.tracer
+        )
+        self.runner = AsyncRunner(pool_size or 1)
         self._github = Github(auth_key)
-        self._org_name = org_name
+        install_connection(self._github, self.connection)
+        self._org_login = org_login
         self._working_repo = working_repo
+        self._orgs: dict[str, Organization] = {}
 
-    def _get_org(self, org_name):
-        user = self._github.get_user()
-        for org in user.get_orgs():
-            if org.name == org_name:
-                return org
+    def _get_org(self, org_login: str) -> Organization:
+        # orgs are looked up by login, not found among the orgs of the user,
+        # and kept for all requests
+        if org_login not in self._orgs:
+            self._orgs[org_login] = self._github.get_organization(org_login)
+        return self._orgs[org_login]
 
     @cached_property
     def org(self) -> Organization:
-        return self._get_org(self._org_name)
+        # the org of the working repo
+        return self._get_org(self._org_login)
 
-    @property
-    @lru_cache
+    @cached_property
     def working_repo(self):
         return self.org.get_repo(self._working_repo)
 
-    def get_org_repos(self):
-        return self.org.get_repos()
+    def close(self):
+        self.runner.close()
+
+    def get_org_repos(self, org_login: str):
+        return self._get_org(org_login).get_repos()
+
+    def get_org_repo(self, name: str, org_login: str) -> Repository:
+        return self._get_org(org_login).get_repo(name)
 
-    def get_org_repo(self, name: str) -> Repository:
-        return self.org.get_repo(name)
+    def get_archive_files(
+        self, repo: Repository, ref: str, paths: set[str]
+    ) -> dict[str, str]:
+        # streams the tarball of the ref and reads only the given files, the
+        # archive is neither saved nor kept in memory
+        files = {}
+        url = repo.get_archive_link("tarball", ref)
+        with self.connection.stream(url) as stream, tarfile.open(
+            fileobj=stream, mode="r|gz"
+        ) as tar:
+            for member in tar:
+                # members are in the <owner>-<repo>-<sha> directory
+                path = member.name.partition("/")[2]
+                if member.isfile() and path in paths:
+                    files[path] = tar.extractfile(member).read().decode("utf-8")
+                    if len(files) == len(paths):
+                        break
+        return files
 
     def get_working_content(self, branch, path) -> str:
         ref = self.working_repo.get_branch(branch).commit.sha
         content = self.working_repo.get_contents(path, ref)
         return get_str_from_git_content(content)
 
-    def commit_if_changed(self, data, path, branch):
-        ref = self.working_repo.get_branch(branch).commit.sha
-        content = self.working_repo.get_contents(path, ref)
-        repo_data = get_str_from_git_content(content)
-        if data != repo_data:
-            logging.info(f"Commit changes to {path}")
-            message = f"ShellExplorer {path} {datetime.now()}"
-            return self.working_repo.update_file(
-                path, message, data, content.sha, branch=branch
-            )
+    def commit_if_changed(self, files: dict[str, Optional[str]], branch):
+        # compare local blob hashes with the branch tree, so unchanged files are
+        # never downloaded, and commit all changed files at once
+        ref = self.working_repo.get_git_ref(f"heads/{branch}")
+        head = self.working_repo.get_git_commit(ref.object.sha)
+        tree = self.working_repo.get_git_tree(head.tree.sha, recursive=True)
+        tree_shas = {element.path: element.sha for element in tree.tree}
+        # None removes the file
+        changed = {
+            path: data
+            for path, data in files.items()
+            if (None if data is None else git_blob_sha(data)) != tree_shas.get(path)
+        }
+        if not changed:
+            logging.info("No changes to commit")
+            return
+
+        logging.info(f"Commit changes to {', '.join(changed)}")
+        elements = [
+            InputGitTreeElement(path, "100644", "blob", content=data)
+            for path, data in changed.items()
+            if data is not None
+        ]
+        if any(data is None for data in changed.values()):
+            # not every PyGithub version sends a null sha to remove a file, so
+            # the tree is made from all kept files instead of the base tree;
+            # files missing from a truncated listing would be removed too
+            if tree.raw_data.get("truncated"):
+                raise ValueError(
+                    f"The tree of {branch} is truncated, files can't be removed"
+                )
+            elements += [
+                InputGitTreeElement(
+                    element.path, element.mode, element.type, sha=element.sha
+                )
+                for element in tree.tree
+                if element.type != "tree" and element.path not in changed
+            ]
+            new_tree = self.working_repo.create_git_tree(elements)
+        else:
+            new_tree = self.working_repo.create_git_tree(elements, base_tree=tree)
+        message = f"ShellExplorer {' '.join(changed)} {datetime.now()}"
+        commit = self.working_repo.create_git_commit(message, new_tree, [head])
+        # not forced, fails if the branch was moved in the meantime
+        ref.edit(commit.sha)
+        return commit
+
+
+class TableLoader(_BaseLoader):
+    pass
+
+
+class TableDumper(_BaseDumper):
+    pass
+
+
+REPO_FIELDS = ("name", "url", "releases")
+
+
+def _construct_release(loader, node):
+    return Release(**loader.construct_mapping(node))
+
+
+def _construct_repo(repo_class, loader, node):
+    return repo_class(**loader.construct_mapping(node, deep=True))
+
+
+def _represent_entity(fields, dumper, entity):
+    return dumper.represent_mapping(
+        entity.yaml_tag, [(field, getattr(entity, field)) for field in fields]
+    )
+
+
+TableLoader.add_constructor(Release.yaml_tag, _construct_release)
+TableDumper.add_representer(Release, partial(_represent_entity, RELEASE_FIELDS))
+for _repo_class in REPO_CLASSES:
+    TableLoader.add_constructor(
+        _repo_class.yaml_tag, partial(_construct_repo, _repo_class)
+    )
+    TableDumper.add_representer(_repo_class, partial(_represent_entity, REPO_FIELDS))
 
 
 class SerializationOperations:
+    # uses libyaml if it's available and produces the same output as the pure
+    # Python yaml.Loader/yaml.Dumper with YAMLObject entities
+    TABLE_ITEM_PATTERN = re.compile(r"^- !", re.MULTILINE)
+    TABLE_NAME_PATTERN = re.compile(r"^  name: (.*)$", re.MULTILINE)
+
     @staticmethod
     def load_table(data):
-        return yaml.load(data, Loader=yaml.Loader)
+        return yaml.load(data, Loader=TableLoader)
 
     @staticmethod
     def dump_table(table):
-        return yaml.dump(table, default_flow_style=False, sort_keys=False)
+        return yaml.dump(
+            table, Dumper=TableDumper, default_flow_style=False, sort_keys=False
+        )
+
+    # a table is the concatenation of its repos dumped one by one, so a table
+    # is updated by replacing the text of the changed repos (shards)
+    @staticmethod
+    def dump_shard(repo: Repo) -> str:
+        return SerializationOperations.dump_table([repo])
+
+    @staticmethod
+    def load_shard(data: str) -> Repo:
+        return SerializationOperations.load_table(data)[0]
+
+    @classmethod
+    def split_table(cls, data: str) -> dict[str, str]:
+        starts = [m.start() for m in cls.TABLE_ITEM_PATTERN.finditer(data)]
+        shards = {}
+        for start, end in zip(starts, starts[1:] + [len(data)]):
+            shard = data[start:end]
+            name = yaml.safe_load(cls.TABLE_NAME_PATTERN.search(shard).group(1))
+            shards[str(name)] = shard
+        return shards
+
+    @staticmethod
+    def join_table(shards: Iterable[str]) -> str:
+        return "".join(shards) or SerializationOperations.dump_table([])
+
+    @staticmethod
+    def load_manifest(data: str) -> dict[str, str]:
+        return yaml.safe_load(data) or {}
+
+    @staticmethod
+    def dump_manifest(manifest: dict[str, str]) -> str:
+        return yaml.safe_dump(
+            {name: manifest[name] for name in sorted(manifest)},
+            default_flow_style=False,
+            sort_keys=False,
+        )
@@ -0,0 +1,126 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+# GitHub allows about 900 REST points per minute before secondary rate limits
+MAX_RATE = 15.0
+BURST = 15
+# budget is spread over the reset window once less than this part of it is left
+SPREAD_BELOW = 0.5
+BACKOFF_BASE = 60.0
+MAX_RETRIES = 5
+
+
+class RequestScheduler:
+    # token bucket every GitHub request waits on, the rate is lowered when the
+    # rate limit budget runs low and requests are paused on 403/429 responses
+    def __init__(
+        self,
+        max_rate: float = MAX_RATE,
+        burst: int = BURST,
+        spread_below: float = SPREAD_BELOW,
+        max_retries: int = MAX_RETRIES,
+        clock=time.monotonic,
+        wall_clock=time.time,
+        sleep=time.sleep,
+    ):
+        self._max_rate = max_rate
+        self._rate = max_rate
+        self._burst = burst
+        self._tokens = float(burst)
+        self._spread_below = spread_below
+        self._max_retries = max_retries
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._last_refill = clock()
+        self._paused_until = 0.0
+        self._budgets: dict[str, tuple[int, int, int]] = {}
+        self.phase = "default"
+        self.calls = Counter()
+        self.retries = Counter()
+        self.waited = Counter()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @contextmanager
+    def use_phase(self, name: str):
+        previous, self.phase = self.phase, name
+        try:
+            yield
+        finally:
+            self.phase = previous
+
+    def acquire(self):
+        with self._lock:
+            now = self._clock()
+            elapsed = now - self._last_refill
+            self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
+            self._last_refill = now
+            wait = max(self._paused_until - now, 0.0)
+            if self._tokens < 1:
+                wait = max(wait, (1 - self._tokens) / self._rate)
+            # reserve the token, so concurrent callers queue up behind us
+            self._tokens -= 1
+            phase = self.phase
+            self.calls[phase] += 1
+            self.waited[phase] += wait
+        if wait > 0:
+            self._sleep(wait)
+
+    def update(self, headers: dict[str, str]):
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            limit = int(headers["x-ratelimit-limit"])
+            reset = int(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        resource = headers.get("x-ratelimit-resource", "core")
+        with self._lock:
+            self._budgets[resource] = (remaining, limit, reset)
+            self._rate = min(
+                self._budget_rate(*budget) for budget in self._budgets.values()
+            )
+
+    def _budget_rate(self, remaining: int, limit: int, reset: int) -> float:
+        if remaining >= limit * self._spread_below:
+            return self._max_rate
+        window = max(reset - self._wall_clock(), 1.0)
+        return min(self._max_rate, max(remaining, 1) / window)
+
+    def backoff(
+        self, status: int, headers: dict[str, str], body: str, attempt: int
+    ) -> Optional[float]:
+        if status not in (403, 429) or attempt >= self._max_retries:
+            return None
+        if "retry-after" in headers:
+            delay = float(headers["retry-after"])
+        elif headers.get("x-ratelimit-remaining") == "0":
+            reset = float(headers.get("x-ratelimit-reset", 0))
+            delay = max(reset - self._wall_clock(), 0.0) + 1
+        elif status == 429 or "rate limit" in body.lower():
+            delay = BACKOFF_BASE * 2**attempt
+        else:
+            # permission errors and the like, nothing to wait for
+            return None
+        logging.warning(f"GitHub rate limit hit, retry in {delay:.0f}s")
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + delay)
+            self.retries[self.phase] += 1
+        return delay
+
+    def log_report(self):
+        logging.info("GitHub calls per phase:")
+        for phase, calls in self.calls.items():
+            logging.info(
+                f"  {phase}: {calls} calls, {self.retries[phase]} retries, "
+                f"waited {self.waited[phase]:.1f}s"
+            )
+        for resource, (remaining, limit, _) in self._budgets.items():
+            logging.info(f"  {resource} budget left: {remaining}/{limit}")
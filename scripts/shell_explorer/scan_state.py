@@ -0,0 +1,78 @@
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+import yaml
+
+if TYPE_CHECKING:
+    from github import Repository
+
+
+class _StateDumper(yaml.SafeDumper):
+    # equal timestamps are often the same object, the dump shouldn't depend on it
+    def ignore_aliases(self, data):
+        return True
+
+
+class ScanState:
+    # index of explored repos: pushed_at, latest release id and the repo type
+    # found by the last scan, used to skip repos that didn't change since then;
+    # repos that matched no type keep the sha of the root tree they were
+    # classified by
+    def __init__(self, entries: Optional[dict[str, dict]] = None):
+        self._entries = entries or {}
+        self._lock = threading.Lock()
+        self.changed = False
+
+    @classmethod
+    def load(cls, data: str) -> "ScanState":
+        entries = yaml.safe_load(data)
+        return cls(entries if isinstance(entries, dict) else {})
+
+    def dump(self) -> str:
+        entries = {name: self._entries[name] for name in sorted(self._entries)}
+        return yaml.dump(
+            entries, Dumper=_StateDumper, default_flow_style=False, sort_keys=False
+        )
+
+    def entries(self) -> dict[str, dict]:
+        with self._lock:
+            return dict(self._entries)
+
+    def merge(self, entries: dict[str, dict]):
+        with self._lock:
+            for name, entry in entries.items():
+                if self._entries.get(name) != entry:
+                    self._entries[name] = entry
+                    self.changed = True
+
+    def get(self, name: str) -> Optional[dict]:
+        return self._entries.get(name)
+
+    def is_unchanged(self, repo: "Repository") -> bool:
+        entry = self._entries.get(repo.name)
+        return bool(entry and repo.pushed_at and entry["pushed_at"] == repo.pushed_at)
+
+    def unclassified_tree_sha(self, name: str) -> Optional[str]:
+        entry = self._entries.get(name)
+        if entry and not entry["type"]:
+            return entry.get("tree_sha")
+
+    def update(
+        self,
+        name: str,
+        pushed_at: Optional[datetime],
+        release_id: Optional[int],
+        repo_type: Optional[str],
+        tree_sha: Optional[str] = None,
+    ):
+        entry = {
+            "pushed_at": pushed_at,
+            "release_id": release_id,
+            "type": repo_type,
+            "tree_sha": tree_sha,
+        }
+        with self._lock:
+            if self._entries.get(name) != entry:
+                self._entries[name] = entry
+                self.changed = True
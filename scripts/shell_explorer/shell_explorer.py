@@ -1,41 +1,63 @@
+import asyncio
+import itertools
 import json
 import logging
 import re
-import sys
 from collections import OrderedDict
-from copy import deepcopy
-from functools import lru_cache
+from functools import cached_property
 from typing import TYPE_CHECKING, Optional
 
-from scripts.shell_explorer.entities import Package, Release, Shell1G, Shell2G, ShellL1
+from github import UnknownObjectException
+
+from scripts.shell_explorer.catalog import (
+    dump_catalog,
+    dump_catalog_line,
+    join_catalog,
+    split_catalog,
+)
+from scripts.shell_explorer.change_feed import ChangeFeed, change_records
+from scripts.shell_explorer.checkpoint import ScanCheckpoint
+from scripts.shell_explorer.entities import (
+    Package,
+    Release,
+    Repo,
+    Shell1G,
+    Shell2G,
+    ShellL1,
+)
+from scripts.shell_explorer.graphql_operations import GraphQLRepoOperations
 from scripts.shell_explorer.helpers import (
+    EXPLORE_ORGS,
     PyVersion,
     get_package_python_version,
     get_str_from_git_content,
+    split_release_key,
 )
+from scripts.shell_explorer.http_cache import ResponseCache
+from scripts.shell_explorer.mirror_operations import MirrorRepoOperations
 from scripts.shell_explorer.operations import RepoOperations, SerializationOperations
+from scripts.shell_explorer.scan_state import ScanState
+from scripts.shell_explorer.tracing import trace_repo
 
 if TYPE_CHECKING:
     from github import Repository
     from github.GitRelease import GitRelease
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    stream=sys.stdout,
-    format=(
-        "%(asctime)s [%(levelname)s]: %(name)s %(module)s - %(funcName)-20s %(message)s"
-    ),
-)
-
-
 class ShellExplorer:
     class CONFIG:
-        EXPLORE_ORG = "Quali"
+        EXPLORE_ORGS = EXPLORE_ORGS
+        WORKING_ORG = "QualiSystems"
         WORKING_REPO = "Shell-Explorer"
         SHELLS_FILE = "shells.yaml"
         PACKAGES_FILE = "packages.yaml"
+        SCAN_STATE_FILE = "scan_state.yaml"
+        CATALOG_FILE = "catalog.jsonl"
+        SHARDS_DIR = "shards"
+        SHARDS_MANIFEST = "shards/manifest.yaml"
+        FEED_INDEX = "feed/index.json"
         EXPLORE_RELEASES_DEPTH = 5
+        CHECKPOINT_INTERVAL = 50
 
     class CONST:
         SHELL_L1_FILES = {"main.py"}
@@ -56,12 +78,90 @@ class ShellExplorer:
         PYTHON_VERSION_2 = "PY2"
         PYTHON_VERSION_3 = "PY3"
 
-    def __init__(self, auth_key, branch, new_releases):
+    def __init__(
+        self,
+        auth_key,
+        branch,
+        new_releases,
+        *,
+        workers=1,
+        cache_dir=None,
+        backend="rest",
+        rescan_all=False,
+        trace_file=None,
+        layout="single",
+        checkpoint_file=None,
+        resume=False,
+        inspect="contents",
+        mirror_dir=None,
+        orgs=None,
+    ):
         self.branch = branch
+        # logins of the explored orgs, their repos are merged into one catalog
+        self.orgs: list[str] = list(orgs or self.CONFIG.EXPLORE_ORGS)
         self.new_releases: dict[str, list[int]] = json.loads(new_releases)
-        self.repo_operations = RepoOperations(
-            auth_key, self.CONFIG.EXPLORE_ORG, self.CONFIG.WORKING_REPO
+        self.workers = workers
+        self.rescan_all = rescan_all
+        self.trace_file = trace_file
+        # tables with new or changed repos
+        self._changed_tables: set[str] = set()
+        # with the sharded layout every repo is kept in its own file as well,
+        # shards are loaded for explored repos only and written if they changed
+        self.sharded = layout == "sharded"
+        self._loaded_shards: dict[str, Repo] = {}
+        self._changed_shards: dict[str, Repo] = {}
+        # change feed records of added repos and releases, releases of explored
+        # repos before the exploration
+        self._changes: list[dict] = []
+        self._previous_releases: dict[str, list[Release]] = {}
+        # a full scan saves its progress every CHECKPOINT_INTERVAL repos of the
+        # org listing, so a failed scan can be resumed
+        self.checkpoint = (
+            ScanCheckpoint(
+                checkpoint_file,
+                {
+                    "branch": branch,
+                    "layout": layout,
+                    "rescan_all": rescan_all,
+                    "orgs": self.orgs,
+                },
+            )
+            if checkpoint_file
+            else None
         )
+        self.resume = resume
+        # release files are read from the release tarball, one download per
+        # release instead of a content call per file
+        self.inspect_archives = inspect == "archive"
+        cache = ResponseCache(cache_dir) if cache_dir else None
+        if backend == "graphql":
+            self.repo_operations = GraphQLRepoOperations(
+                auth_key,
+                self.CONFIG.WORKING_ORG,
+                self.CONFIG.WORKING_REPO,
+                cache=cache,
+                pool_size=workers,
+                releases_depth=self.CONFIG.EXPLORE_RELEASES_DEPTH,
+            )
+        elif backend == "mirror":
+            self.repo_operations = MirrorRepoOperations(
+                auth_key,
+                self.CONFIG.WORKING_ORG,
+                self.CONFIG.WORKING_REPO,
+                cache=cache,
+                pool_size=workers,
+                mirror_dir=mirror_dir,
+                releases_depth=self.CONFIG.EXPLORE_RELEASES_DEPTH,
+                root_org=self.orgs[0],
+            )
+        else:
+            self.repo_operations = RepoOperations(
+                auth_key,
+                self.CONFIG.WORKING_ORG,
+                self.CONFIG.WORKING_REPO,
+                cache=cache,
+                pool_size=workers,
+            )
         self._repo_type_dict = OrderedDict(
             [
                 (Package, self._is_it_a_package),
@@ -71,42 +171,53 @@ class ShellExplorer:
             ]
         )
 
-    @property
-    @lru_cache
-    def _repo_shells(self):
+    @cached_property
+    def _shells(self):
         content = self.repo_operations.get_working_content(
             self.branch, self.CONFIG.SHELLS_FILE
         )
         return set(SerializationOperations.load_table(content))
 
-    @property
-    @lru_cache
-    def _shells(self):
-        return deepcopy(self._repo_shells)
-
-    @property
-    @lru_cache
+    @cached_property
     def _shells_dict(self):
         return {repo.name: repo for repo in self._shells}
 
-    @property
-    @lru_cache
-    def _repo_packages(self):
+    @cached_property
+    def _packages(self):
         content = self.repo_operations.get_working_content(
             self.branch, self.CONFIG.PACKAGES_FILE
         )
         return set(SerializationOperations.load_table(content))
 
-    @property
-    @lru_cache
-    def _packages(self):
-        return deepcopy(self._repo_packages)
-
-    @property
-    @lru_cache
+    @cached_property
     def _packages_dict(self):
         return {repo.name: repo for repo in self._packages}
 
+    @cached_property
+    def _manifest(self) -> dict[str, str]:
+        # names and yaml tags of all repos in the sharded catalog
+        try:
+            content = self.repo_operations.get_working_content(
+                self.branch, self.CONFIG.SHARDS_MANIFEST
+            )
+        except UnknownObjectException:
+            # the first sharded scan splits the tables into shards
+            repos = {repo.name: repo for repo in self._shells | self._packages}
+            self._loaded_shards.update(repos)
+            self._changed_shards.update(repos)
+            return {name: repo.yaml_tag for name, repo in repos.items()}
+        return SerializationOperations.load_manifest(content)
+
+    @cached_property
+    def _scan_state(self):
+        try:
+            content = self.repo_operations.get_working_content(
+                self.branch, self.CONFIG.SCAN_STATE_FILE
+            )
+        except UnknownObjectException:
+            return ScanState()
+        return ScanState.load(content)
+
     def _match_by_content(self, content, file_list):
         if content.intersection(file_list) == file_list:
             return True
@@ -134,64 +245,98 @@ class ShellExplorer:
             self.CONST.NAME_PATTERN_L1, name
         ) and self._match_by_content(content, self.CONST.SHELL_L1_FILES)
 
-    def _py3_ver_by_metadata(self, git_repo, release) -> bool:
-        try:
-            content = git_repo.get_contents(self.CONST.METADATA_FILE, release.tag_name)
-            content = get_str_from_git_content(content)
-            match = re.search(self.CONST.PY_VER_PATTERN, content)
-        except Exception:
-            result = False
-        else:
-            result = bool(match)
-        return result
+    def _archive_py_version(self, git_repo, release, path, parse) -> "PyVersion":
+        path = path.strip("/")
+        files = self.repo_operations.get_archive_files(
+            git_repo, release.tag_name, {path}
+        )
+        if path not in files:
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+        return parse(files[path])
+
+    def _release_file_py_version(self, git_repo, release, path, parse) -> "PyVersion":
+        if self.inspect_archives:
+            return self._archive_py_version(git_repo, release, path, parse)
+        content = git_repo.get_contents(path, release.tag_name)
+        return parse(get_str_from_git_content(content))
+
+    def _py_version_by_metadata(self, content: str) -> "PyVersion":
+        if re.search(self.CONST.PY_VER_PATTERN, content):
+            return PyVersion.PY3
+        return PyVersion.PY2
 
     def _get_shell_py_version(self, git_repo, release) -> "PyVersion":
-        if self._py3_ver_by_metadata(git_repo, release):
-            version = PyVersion.PY3
-        else:
+        try:
+            version = self._release_file_py_version(
+                git_repo,
+                release,
+                self.CONST.METADATA_FILE,
+                self._py_version_by_metadata,
+            )
+        except Exception:
             version = PyVersion.PY2
         return version
 
     def _get_package_py_version(self, git_repo, release) -> "PyVersion":
-        content = git_repo.get_contents(self.CONST.SETUP_PY, release.tag_name)
-        content = get_str_from_git_content(content)
-        return get_package_python_version(content)
+        return self._release_file_py_version(
+            git_repo, release, self.CONST.SETUP_PY, get_package_python_version
+        )
 
-    def _filter_releases_by_py_ver(
+    def _get_py_version(self, git_repo, release, is_package: bool) -> "PyVersion":
+        if is_package:
+            return self._get_package_py_version(git_repo, release)
+        return self._get_shell_py_version(git_repo, release)
+
+    async def _filter_releases_by_py_ver_async(
         self, git_repo, releases, existing_releases, is_package: bool
     ):
         existing_releases = list(filter(lambda r: r in releases, existing_releases))
         version_dict = {r.python_version: r for r in existing_releases}
+        new_releases = []
         for release in releases:
-            if release not in existing_releases:
-                if is_package:
-                    py_version = self._get_package_py_version(git_repo, release)
-                else:
-                    py_version = self._get_shell_py_version(git_repo, release)
-                release.python_version = py_version.value
-                if release.python_version:
-                    ex_rel = version_dict.get(release.python_version)
-                    if not ex_rel or release > ex_rel:
-                        version_dict[release.python_version] = release
-            else:
+            if release in existing_releases:
                 break
+            new_releases.append(release)
+        # files of all new releases are fetched concurrently
+        py_versions = await asyncio.gather(
+            *(
+                self.repo_operations.runner.call(
+                    self._get_py_version, git_repo, release, is_package
+                )
+                for release in new_releases
+            )
+        )
+        for release, py_version in zip(new_releases, py_versions):
+            release.python_version = py_version.value
+            if release.python_version:
+                ex_rel = version_dict.get(release.python_version)
+                if not ex_rel or release > ex_rel:
+                    version_dict[release.python_version] = release
 
         sorted_releases = sorted(version_dict.values(), reverse=True)
         logging.info(f"New releases: {sorted_releases}")
         return sorted_releases
 
-    def _repo_releases(
+    def _latest_git_releases(self, repo: "Repository") -> list["GitRelease"]:
+        releases = []
+        for release in repo.get_releases():
+            if release.published_at:
+                releases.append(release)
+                if len(releases) == self.CONFIG.EXPLORE_RELEASES_DEPTH:
+                    break
+        return releases
+
+    async def _git_releases_async(
         self, repo: "Repository", release_ids: Optional[list[str]]
-    ) -> list[Release]:
+    ) -> list["GitRelease"]:
+        call = self.repo_operations.runner.call
         if not release_ids:
-            releases = [r for r in repo.get_releases() if r.published_at]
-            releases = releases[: self.CONFIG.EXPLORE_RELEASES_DEPTH]
+            releases = await call(self._latest_git_releases, repo)
         else:
-            releases = list(map(repo.get_release, release_ids))
-        return [
-            self._create_release_object(r)
-            for r in sorted(releases, key=lambda: r.published_at, reverse=True)
-        ]
+            releases = await asyncio.gather(
+                *(call(repo.get_release, release_id) for release_id in release_ids)
+            )
+        return sorted(releases, key=lambda r: r.published_at, reverse=True)
 
     def _create_release_object(self, git_release: "GitRelease") -> Optional["Release"]:
         if git_release:
@@ -202,54 +347,404 @@ class ShellExplorer:
                 git_release.html_url,
             )
 
+    @staticmethod
+    def _keep_release_titles(releases: list["Release"], known: list["Release"]):
+        # releases read from tags are titled by the tag name, so known ones
+        # keep the title and URL they got from the API and don't look new
+        known_by_tag = {release.tag_name: release for release in known}
+        for release in releases:
+            if release.tag_name in known_by_tag:
+                release.title = known_by_tag[release.tag_name].title
+                release.release_url = known_by_tag[release.tag_name].release_url
+
     def _extract_existing_repo(self, repo):
         return self._shells_dict.get(repo.name, self._packages_dict.get(repo.name))
 
-    def _explore_repo(
+    def _is_in_catalog(self, name: str) -> bool:
+        if self.sharded:
+            return name in self._manifest
+        return name in self._shells_dict or name in self._packages_dict
+
+    def _shard_path(self, name: str) -> str:
+        return f"{self.CONFIG.SHARDS_DIR}/{name}.yaml"
+
+    def _load_shard(self, name: str) -> str:
+        return self.repo_operations.get_working_content(
+            self.branch, self._shard_path(name)
+        )
+
+    async def _existing_repo_async(self, repo: "Repository") -> Optional["Repo"]:
+        if not self.sharded:
+            return self._extract_existing_repo(repo)
+        if repo.name not in self._manifest:
+            return None
+        if repo.name not in self._loaded_shards:
+            content = await self.repo_operations.runner.call(
+                self._load_shard, repo.name
+            )
+            self._loaded_shards[repo.name] = SerializationOperations.load_shard(content)
+        return self._loaded_shards[repo.name]
+
+    def _root_tree(self, repo: "Repository"):
+        return repo.get_git_tree(repo.default_branch)
+
+    async def _inspect_repo_async(
         self, repo: "Repository", release_ids: Optional[list[int]] = None
-    ):
+    ) -> Optional["Repo"]:
+        # doesn't change shells and packages tables, so repos can be inspected
+        # concurrently
+        with trace_repo(repo.name):
+            return await self._inspect_repo_releases_async(repo, release_ids)
+
+    async def _inspect_repo_releases_async(
+        self, repo: "Repository", release_ids: Optional[list[int]]
+    ) -> Optional["Repo"]:
         logging.info(f"Explore {repo.name}")
-        repo_object = self._extract_existing_repo(repo)
-        releases = self._repo_releases(repo, release_ids)
+        call = self.repo_operations.runner.call
+        repo_object = await self._existing_repo_async(repo)
+        root_tree = tree_sha = None
+        if not repo_object and not self.rescan_all:
+            # the type depends only on the root of the default branch, so a repo
+            # that matched no type is not explored until its root tree changes
+            tree_sha = self._scan_state.unclassified_tree_sha(repo.name)
+            if tree_sha:
+                root_tree = await call(self._root_tree, repo)
+                if root_tree.sha == tree_sha:
+                    release_id = self._scan_state.get(repo.name)["release_id"]
+                    self._scan_state.update(
+                        repo.name, repo.pushed_at, release_id, None, tree_sha
+                    )
+                    return
+                tree_sha = None
+        git_releases = await self._git_releases_async(repo, release_ids)
+        releases = [self._create_release_object(r) for r in git_releases]
+        if repo_object and not self.repo_operations.RELEASE_TITLES:
+            self._keep_release_titles(releases, repo_object.releases)
         if not repo_object and releases:
-            content = {c.name for c in repo.get_contents("")}
+            root_tree = root_tree or await call(self._root_tree, repo)
+            content = {entry.path for entry in root_tree.tree}
             repo_name = repo.name
             for repo_class, check_func in self._repo_type_dict.items():
                 if check_func(content, repo_name):
                     repo_object = repo_class(repo_name, repo.html_url)
                     logging.info(f"Added {repo_object}")
                     break
+            else:
+                tree_sha = root_tree.sha
+        self._scan_state.update(
+            repo.name,
+            repo.pushed_at,
+            git_releases[0].id if git_releases else None,
+            repo_object.yaml_tag if repo_object else None,
+            tree_sha,
+        )
         if not repo_object or not releases:
             return
 
         is_package = isinstance(repo_object, Package)
         if releases[0] not in repo_object.releases:
-            repo_object.releases = self._filter_releases_by_py_ver(
+            self._previous_releases[repo.name] = repo_object.releases
+            repo_object.releases = await self._filter_releases_by_py_ver_async(
                 repo, releases, repo_object.releases, is_package
             )
-            if is_package:
-                self._packages.add(repo_object)
-            else:
-                self._shells.add(repo_object)
+            return repo_object
 
-    def _explore_releases(self):
-        if not self.new_releases:
-            for repo in self.repo_operations.get_org_repos():
-                self._explore_repo(repo)
+    def _table_file(self, repo_object: "Repo") -> str:
+        if isinstance(repo_object, Package):
+            return self.CONFIG.PACKAGES_FILE
+        return self.CONFIG.SHELLS_FILE
+
+    def _add_repo_object(self, repo_object: Optional["Repo"], record_changes=True):
+        if not repo_object or not repo_object.changed:
+            return
+        if record_changes:
+            previous_releases = self._previous_releases.pop(repo_object.name, [])
+            if not self._is_in_catalog(repo_object.name):
+                previous_releases = None
+            self._changes += change_records(repo_object, previous_releases)
+        self._changed_tables.add(self._table_file(repo_object))
+        if self.sharded:
+            self._manifest[repo_object.name] = repo_object.yaml_tag
+            self._changed_shards[repo_object.name] = repo_object
+        elif isinstance(repo_object, Package):
+            self._packages.add(repo_object)
         else:
-            for repo_name, release_ids in self.new_releases.items():
-                repo = self.repo_operations.get_org_repo(repo_name)
-                self._explore_repo(repo, release_ids)
+            self._shells.add(repo_object)
 
-    def scan_and_commit(self):
-        self._explore_releases()
-        self.repo_operations.commit_if_changed(
-            SerializationOperations.dump_table(sorted(self._shells)),
-            self.CONFIG.SHELLS_FILE,
-            self.branch,
+    def _sharded_table_names(self, file_name: str) -> list[str]:
+        # names in the order of the monolithic table
+        is_packages = file_name == self.CONFIG.PACKAGES_FILE
+        return [
+            name
+            for tag, name in sorted((tag, name) for name, tag in self._manifest.items())
+            if (tag == Package.yaml_tag) == is_packages
+        ]
+
+    def _working_content_or_none(self, path: str) -> Optional[str]:
+        try:
+            return self.repo_operations.get_working_content(self.branch, path)
+        except UnknownObjectException:
+            return None
+
+    def _changed_sharded_files(self) -> dict[str, str]:
+        # the monolithic tables and the catalog are updated by replacing the
+        # text of the changed repos, other shards are neither loaded nor parsed
+        shards = {
+            name: SerializationOperations.dump_shard(repo)
+            for name, repo in self._changed_shards.items()
+        }
+        files = {self._shard_path(name): shard for name, shard in shards.items()}
+        files[self.CONFIG.SHARDS_MANIFEST] = SerializationOperations.dump_manifest(
+            self._manifest
+        )
+        for file_name in sorted(self._changed_tables):
+            table = SerializationOperations.split_table(
+                self._working_content_or_none(file_name) or ""
+            )
+            table.update(shards)
+            files[file_name] = SerializationOperations.join_table(
+                table.get(name) or self._load_shard(name)
+                for name in self._sharded_table_names(file_name)
+            )
+        content = self._working_content_or_none(self.CONFIG.CATALOG_FILE)
+        lines = split_catalog(content) if content else {}
+        lines.update(
+            (name, dump_catalog_line(repo))
+            for name, repo in self._changed_shards.items()
         )
-        self.repo_operations.commit_if_changed(
-            SerializationOperations.dump_table(sorted(self._packages)),
-            self.CONFIG.PACKAGES_FILE,
-            self.branch,
+        names = self._sharded_table_names(self.CONFIG.SHELLS_FILE)
+        names += self._sharded_table_names(self.CONFIG.PACKAGES_FILE)
+        files[self.CONFIG.CATALOG_FILE] = join_catalog(
+            (name, lines.get(name) or self._catalog_line_from_shard(name))
+            for name in names
         )
+        return files
+
+    def _catalog_line_from_shard(self, name: str) -> str:
+        repo = SerializationOperations.load_shard(self._load_shard(name))
+        return dump_catalog_line(repo)
+
+    def _changed_feed_files(self) -> dict[str, Optional[str]]:
+        feed = ChangeFeed(
+            self.CONFIG.FEED_INDEX,
+            self._working_content_or_none(self.CONFIG.FEED_INDEX),
+        )
+        return feed.append(self._changes, self._load_feed_segment)
+
+    def _load_feed_segment(self, path: str) -> str:
+        return self.repo_operations.get_working_content(self.branch, path)
+
+    def _changed_files(self) -> dict[str, Optional[str]]:
+        files = {}
+        if self._changes:
+            files.update(self._changed_feed_files())
+        if self.sharded:
+            if self._changed_shards or self.rescan_all:
+                files.update(self._changed_sharded_files())
+            if self._scan_state.changed:
+                files[self.CONFIG.SCAN_STATE_FILE] = self._scan_state.dump()
+            return files
+        for file_name, table in (
+            (self.CONFIG.SHELLS_FILE, self._shells),
+            (self.CONFIG.PACKAGES_FILE, self._packages),
+        ):
+            if file_name in self._changed_tables:
+                files[file_name] = SerializationOperations.dump_table(sorted(table))
+        # a full rescan publishes the catalog even if the tables didn't change
+        if self._changed_tables or self.rescan_all:
+            files[self.CONFIG.CATALOG_FILE] = dump_catalog(
+                sorted(self._shells) + sorted(self._packages)
+            )
+        if self._scan_state.changed:
+            files[self.CONFIG.SCAN_STATE_FILE] = self._scan_state.dump()
+        return files
+
+    async def _explore_repo_async(
+        self, repo: "Repository", release_ids: Optional[list[int]] = None
+    ):
+        self._add_repo_object(await self._inspect_repo_async(repo, release_ids))
+
+    def _explore_repo(
+        self, repo: "Repository", release_ids: Optional[list[int]] = None
+    ):
+        asyncio.run(self._explore_repo_async(repo, release_ids))
+
+    def _is_unchanged(self, repo: "Repository") -> bool:
+        if self.rescan_all or not self._scan_state.is_unchanged(repo):
+            return False
+        # the catalog could be changed by hand, rescan repos missing in it
+        if self._scan_state.get(repo.name)["type"]:
+            return self._is_in_catalog(repo.name)
+        return True
+
+    async def _explore_repos_async(self, repos: list["Repository"]):
+        semaphore = asyncio.Semaphore(self.workers)
+
+        async def inspect(repo):
+            async with semaphore:
+                return await self._inspect_repo_async(repo)
+
+        # gather keeps the order of the repos, so results are merged the same
+        # way as in a serial run
+        for repo_object in await asyncio.gather(*map(inspect, repos)):
+            self._add_repo_object(repo_object)
+
+    def _changed_repo_objects(self) -> list["Repo"]:
+        if self.sharded:
+            return list(self._changed_shards.values())
+        return [repo for repo in self._shells | self._packages if repo.changed]
+
+    def _restore_repo_object(self, repo_object: "Repo"):
+        # replaces the loaded repo with the one explored before the checkpoint
+        repo_object.changed = True
+        if self.sharded:
+            self._loaded_shards[repo_object.name] = repo_object
+        elif isinstance(repo_object, Package):
+            self._packages.discard(repo_object)
+            self._packages_dict[repo_object.name] = repo_object
+        else:
+            self._shells.discard(repo_object)
+            self._shells_dict[repo_object.name] = repo_object
+        self._add_repo_object(repo_object, record_changes=False)
+
+    def _resume_position(self, org_repos: list["Repository"]) -> int:
+        data = self.checkpoint.load()
+        if not data:
+            logging.info("No scan checkpoint, explore from the start")
+            return 0
+        for repo_object in data["repos"]:
+            self._restore_repo_object(repo_object)
+        self._changes += data["changes"]
+        self._scan_state.merge(data["scan_state"])
+        position = data["position"]
+        if position and (
+            position > len(org_repos)
+            or org_repos[position - 1].name != data["last_repo"]
+        ):
+            # repos explored before are skipped by the scan state anyway
+            logging.warning("The org listing changed since the checkpoint")
+            return 0
+        logging.info(f"Resume the scan from repo {position} of {len(org_repos)}")
+        return position
+
+    def _save_checkpoint(self, position: int, last_repo: str):
+        self.checkpoint.save(
+            position,
+            last_repo,
+            self._changed_repo_objects(),
+            self._scan_state.entries(),
+            self._changes,
+        )
+
+    def _list_org_repos(self, org_login: str) -> list["Repository"]:
+        return list(self.repo_operations.get_org_repos(org_login))
+
+    async def _org_repos_async(self) -> list["Repository"]:
+        # the orgs are listed concurrently and their listings are interleaved,
+        # so every batch explores all orgs at once; the catalog is keyed by
+        # repo names, a name is explored in the first org that has it
+        call = self.repo_operations.runner.call
+        listings = await asyncio.gather(
+            *(call(self._list_org_repos, org_login) for org_login in self.orgs)
+        )
+        names: dict[str, str] = {}
+        org_repos = []
+        for org_login, repos in zip(self.orgs, listings):
+            org_repos.append([])
+            for repo in repos:
+                if repo.name in names:
+                    logging.warning(
+                        f"Skip {org_login}/{repo.name}, explored in {names[repo.name]}"
+                    )
+                    continue
+                names[repo.name] = org_login
+                org_repos[-1].append(repo)
+        return [
+            repo
+            for repos in itertools.zip_longest(*org_repos)
+            for repo in repos
+            if repo is not None
+        ]
+
+    async def _explore_org_async(self):
+        call = self.repo_operations.runner.call
+        org_repos = await self._org_repos_async()
+        position = 0
+        if self.checkpoint and self.resume:
+            position = await call(self._resume_position, org_repos)
+        interval = (
+            self.CONFIG.CHECKPOINT_INTERVAL if self.checkpoint else len(org_repos) or 1
+        )
+        skipped = 0
+        for start in range(position, len(org_repos), interval):
+            batch = org_repos[start : start + interval]
+            repos = [repo for repo in batch if not self._is_unchanged(repo)]
+            skipped += len(batch) - len(repos)
+            await self._explore_repos_async(repos)
+            if self.checkpoint:
+                await call(self._save_checkpoint, start + len(batch), batch[-1].name)
+        logging.info(f"Skipped {skipped} repos without changes since the last scan")
+
+    def _has_org_repo(self, repo_name: str, org_login: str) -> bool:
+        try:
+            self.repo_operations.get_org_repo(repo_name, org_login)
+        except UnknownObjectException:
+            return False
+        return True
+
+    async def _release_repo_async(self, key: str) -> Optional["Repository"]:
+        # as in the full scan, a name is explored in the first org that has it,
+        # releases of the same name in the other orgs are skipped
+        call = self.repo_operations.runner.call
+        org_login, repo_name = split_release_key(key, self.orgs[0])
+        logins = [login.lower() for login in self.orgs]
+        position = (
+            logins.index(org_login.lower()) if org_login.lower() in logins else None
+        )
+        for earlier_org in self.orgs[:position]:
+            if await call(self._has_org_repo, repo_name, earlier_org):
+                logging.warning(f"Skip {key}, explored in {earlier_org}")
+                return None
+        return await call(self.repo_operations.get_org_repo, repo_name, org_login)
+
+    async def _explore_releases_async(self):
+        if not self.new_releases:
+            await self._explore_org_async()
+        else:
+            for key, release_ids in self.new_releases.items():
+                repo = await self._release_repo_async(key)
+                if repo is not None:
+                    await self._explore_repo_async(repo, release_ids)
+
+    async def scan_and_commit_async(self):
+        scheduler = self.repo_operations.scheduler
+        call = self.repo_operations.runner.call
+        with scheduler.use_phase("load"):
+            if self.sharded:
+                await call(lambda: (self._manifest, self._scan_state))
+            else:
+                await call(
+                    lambda: (self._shells_dict, self._packages_dict, self._scan_state)
+                )
+        with scheduler.use_phase("explore"):
+            await self._explore_releases_async()
+        with scheduler.use_phase("commit"):
+            files = await call(self._changed_files)
+            if files:
+                await call(self.repo_operations.commit_if_changed, files, self.branch)
+            else:
+                logging.info("Nothing changed")
+            if self.checkpoint and not self.new_releases:
+                self.checkpoint.remove()
+        scheduler.log_report()
+        if self.repo_operations.cache:
+            self.repo_operations.cache.log_stats()
+        self.repo_operations.tracer.log_summary()
+        if self.trace_file:
+            self.repo_operations.tracer.dump(self.trace_file)
+
+    def scan_and_commit(self):
+        asyncio.run(self.scan_and_commit_async())
+
+    def close(self):
+        self.repo_operations.close()
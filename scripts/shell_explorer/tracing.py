@@ -0,0 +1,90 @@
+import json
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import urlsplit
+
+_current_repo: ContextVar[Optional[str]] = ContextVar("current_repo", default=None)
+
+
+@contextmanager
+def trace_repo(name: str):
+    # GitHub calls made inside are attributed to the repo
+    token = _current_repo.set(name)
+    try:
+        yield
+    finally:
+        _current_repo.reset(token)
+
+
+class Tracer:
+    # keeps a record of every GitHub call: latency, size, cache status and
+    # the repo and phase that triggered it
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records: list[dict] = []
+
+    def record(
+        self,
+        verb: str,
+        url: str,
+        status: int,
+        latency: float,
+        size: int,
+        cache: str,
+        phase: Optional[str],
+    ):
+        record = {
+            "verb": verb,
+            "path": urlsplit(url).path,
+            "status": status,
+            "latency_ms": round(latency * 1000, 3),
+            "bytes": size,
+            "cache": cache,
+            "phase": phase,
+            "repo": _current_repo.get(),
+        }
+        with self._lock:
+            self.records.append(record)
+
+    def summary(self, top: int = 10) -> dict:
+        phases = defaultdict(lambda: {"calls": 0, "time_ms": 0.0, "bytes": 0})
+        repos = defaultdict(lambda: {"calls": 0, "time_ms": 0.0})
+        cache = defaultdict(int)
+        for record in self.records:
+            phase = phases[record["phase"] or "-"]
+            phase["calls"] += 1
+            phase["time_ms"] += record["latency_ms"]
+            phase["bytes"] += record["bytes"]
+            cache[record["cache"]] += 1
+            if record["repo"]:
+                repo = repos[record["repo"]]
+                repo["calls"] += 1
+                repo["time_ms"] += record["latency_ms"]
+        top_repos = sorted(repos.items(), key=lambda r: r[1]["time_ms"], reverse=True)
+        return {
+            "calls": len(self.records),
+            "phases": dict(phases),
+            "cache": dict(cache),
+            "top_repos": dict(top_repos[:top]),
+        }
+
+    def dump(self, path: str):
+        with open(path, "w") as fo:
+            json.dump({"summary": self.summary(), "calls": self.records}, fo, indent=1)
+
+    def log_summary(self, top: int = 10):
+        summary = self.summary(top)
+        logging.info(f"GitHub calls: {summary['calls']}, cache: {summary['cache']}")
+        logging.info(f"{'phase':<20}{'calls':>8}{'time, s':>10}{'KB':>10}")
+        for name, phase in summary["phases"].items():
+            logging.info(
+                f"{name:<20}{phase['calls']:>8}{phase['time_ms'] / 1000:>10.1f}"
+                f"{phase['bytes'] // 1024:>10}"
+            )
+        logging.info(f"{'repo':<40}{'calls':>8}{'time, s':>10}")
+        for name, repo in summary["top_repos"].items():
+            logging.info(f"{name:<40}{repo['calls']:>8}{repo['time_ms'] / 1000:>10.1f}")
@@ -0,0 +1,202 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from typing import BinaryIO, Callable, Iterator, Optional, TypeVar
+
+import requests
+from github import Github
+from github.Requester import HTTPSRequestsConnectionClass, RequestsResponse
+
+from scripts.shell_explorer.http_cache import CachedResponse, ResponseCache
+from scripts.shell_explorer.rate_limit import RequestScheduler
+from scripts.shell_explorer.tracing import Tracer
+
+T = TypeVar("T")
+
+
+class GithubConnection(HTTPSRequestsConnectionClass):
+    # PyGithub creates a connection for every request when connection classes are
+    # injected, so the session is shared to keep connections alive; the cache,
+    # scheduler and tracer are set on a subclass made for every client
+    session = requests.Session()
+    pool_size = requests.adapters.DEFAULT_POOLSIZE
+    cache: Optional[ResponseCache] = None
+    scheduler: Optional[RequestScheduler] = None
+    tracer: Optional[Tracer] = None
+
+    def __init__(
+        self,
+        host,
+        port=None,
+        strict=False,
+        timeout=None,
+        retry=None,
+        pool_size=None,
+        **kwargs,
+    ):
+        self.host = host
+        self.port = port if port else 443
+        self.protocol = "https"
+        self.timeout = timeout
+        self.verify = kwargs.get("verify", True)
+
+    def getresponse(self):
+        url = f"{self.protocol}://{self.host}:{self.port}{self.url}"
+        headers = dict(self.headers)
+        cache_key = cached = None
+        if self.cache and self.verb == "GET" and not _is_conditional(headers):
+            cache_key = self.cache.key(url, headers)
+            cached = self.cache.get(cache_key)
+            if cached:
+                headers.update(cached.validators())
+
+        r = self.send(
+            self.verb,
+            url,
+            cacheable=cache_key is not None,
+            headers=headers,
+            data=self.input,
+            timeout=self.timeout,
+            verify=self.verify,
+            allow_redirects=False,
+        )
+
+        if cache_key is None:
+            return RequestsResponse(r)
+        if r.status_code == 304 and cached:
+            self.cache.record_hit()
+            # keep fresh rate limit headers from the 304 response
+            cached.headers.update({k.lower(): v for k, v in r.headers.items()})
+            return cached
+        self.cache.record_miss()
+        response = RequestsResponse(r)
+        if r.status_code == 200:
+            self.cache.put(
+                cache_key,
+                CachedResponse(
+                    r.status_code,
+                    {k.lower(): v for k, v in r.headers.items()},
+                    response.text,
+                ),
+            )
+        return response
+
+    @classmethod
+    def send(
+        cls, verb: str, url: str, cacheable: bool = False, **kwargs
+    ) -> requests.Response:
+        # every GitHub request, REST, GraphQL or download, goes through the
+        # scheduler; a successful download is traced by stream when it's read
+        attempt = 0
+        while True:
+            if cls.scheduler:
+                cls.scheduler.acquire()
+            started = time.perf_counter()
+            r = cls.session.request(verb, url, **kwargs)
+            if cls.tracer and not (kwargs.get("stream") and r.ok):
+                cls._trace(verb, url, r, time.perf_counter() - started, cacheable)
+            if not cls.scheduler:
+                return r
+            headers = {k.lower(): v for k, v in r.headers.items()}
+            cls.scheduler.update(headers)
+            if r.status_code not in (403, 429):
+                return r
+            if cls.scheduler.backoff(r.status_code, headers, r.text, attempt) is None:
+                return r
+            r.close()
+            attempt += 1
+
+    @classmethod
+    @contextmanager
+    def stream(cls, url: str, **kwargs) -> Iterator[BinaryIO]:
+        # downloads, e.g. release archives, are read while they arrive and
+        # traced with the number of bytes read when the stream is closed
+        started = time.perf_counter()
+        with cls.send("GET", url, stream=True, **kwargs) as r:
+            r.raise_for_status()
+            try:
+                yield r.raw
+            finally:
+                if cls.tracer:
+                    cls.tracer.record(
+                        "GET",
+                        url,
+                        r.status_code,
+                        time.perf_counter() - started,
+                        r.raw.tell(),
+                        "-",
+                        cls.scheduler.phase if cls.scheduler else None,
+                    )
+
+    @classmethod
+    def _trace(cls, verb, url, r, latency, cacheable):
+        if cacheable:
+            cache = "hit" if r.status_code == 304 else "miss"
+        else:
+            cache = "-"
+        cls.tracer.record(
+            verb,
+            url,
+            r.status_code,
+            latency,
+            len(r.content),
+            cache,
+            cls.scheduler.phase if cls.scheduler else None,
+        )
+
+
+class AsyncRunner:
+    # runs blocking PyGithub calls for asyncio code, at most `concurrency` calls
+    # at once, each over a keep-alive connection from the shared session pool
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = concurrency
+        self._executor = ThreadPoolExecutor(concurrency, thread_name_prefix="github")
+
+    async def call(self, func: Callable[..., T], *args, **kwargs) -> T:
+        loop = asyncio.get_running_loop()
+        # the worker thread sees the context variables of the task, e.g. the
+        # traced repo
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, partial(context.run, func, *args, **kwargs)
+        )
+
+    def close(self):
+        self._executor.shutdown()
+
+
+def _is_conditional(headers: dict[str, str]) -> bool:
+    return any(h in headers for h in ("If-None-Match", "If-Modified-Since"))
+
+
+def connection_class(
+    cache: Optional[ResponseCache] = None,
+    pool_size: Optional[int] = None,
+    scheduler: Optional[RequestScheduler] = None,
+    tracer: Optional[Tracer] = None,
+) -> type[GithubConnection]:
+    # the shared session pool only grows, so it fits the largest client
+    if pool_size and pool_size > GithubConnection.pool_size:
+        GithubConnection.pool_size = pool_size
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        GithubConnection.session.mount("https://", adapter)
+    return type(
+        "GithubConnection",
+        (GithubConnection,),
+        {"cache": cache, "scheduler": scheduler, "tracer": tracer},
+    )
+
+
+def install_connection(github: Github, connection: type[GithubConnection]):
+    # Requester.injectConnectionClasses changes the connection classes of all
+    # clients, so they are set on the requester of this client only; connections
+    # are not reused, as with injected classes
+    requester = github._Github__requester
+    requester._Requester__persist = False
+    requester._Requester__connectionClass = connection
+    requester._Requester__httpsConnectionClass = connection
@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Sequence
+
+from scripts.shell_explorer.helpers import EXPLORE_ORGS, release_key
+
+SIGNATURE_HEADER = "X-Hub-Signature-256"
+EVENT_HEADER = "X-GitHub-Event"
+RELEASE_ACTIONS = {"published"}
+DEBOUNCE = 30.0
+MAX_DELAY = 300.0
+
+
+def sign_payload(secret: str, body: bytes) -> str:
+    digest = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    return bool(signature) and hmac.compare_digest(
+        sign_payload(secret, body), signature
+    )
+
+
+class ReleaseBatcher:
+    # collects released repos and explores them together when no new release
+    # came for `debounce` seconds (or `max_delay` after the first one), so a
+    # burst of releases ends up in one commit; a batch that failed is explored
+    # again with the next one
+    def __init__(
+        self,
+        explore: Callable[[dict[str, list[int]]], None],
+        debounce: float = DEBOUNCE,
+        max_delay: float = MAX_DELAY,
+    ):
+        self._explore = explore
+        self._debounce = debounce
+        self._max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending: dict[str, list[int]] = {}
+        self._failed: dict[str, list[int]] = {}
+        self._first_event = self._last_event = 0.0
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        # explores what is pending and waits for it
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def add(self, repo_name: str, release_id: int):
+        with self._condition:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._last_event = now
+            _merge_releases(self._pending, {repo_name: [release_id]})
+            self._condition.notify()
+
+    def _deadline(self) -> float:
+        return min(
+            self._last_event + self._debounce, self._first_event + self._max_delay
+        )
+
+    def _wait_for_batch(self) -> dict[str, list[int]]:
+        with self._condition:
+            while not self._pending and not self._stopped:
+                self._condition.wait()
+            while not self._stopped:
+                timeout = self._deadline() - time.monotonic()
+                if timeout <= 0:
+                    break
+                self._condition.wait(timeout)
+            pending, self._pending = self._pending, {}
+            if pending or self._stopped:
+                pending = _merge_releases(self._failed, pending)
+                self._failed = {}
+            return pending
+
+    def _run(self):
+        while True:
+            pending = self._wait_for_batch()
+            if pending:
+                logging.info(f"Explore new releases {pending}")
+                try:
+                    self._explore(pending)
+                except Exception:
+                    logging.exception(f"Failed to explore new releases {pending}")
+                    self._requeue(pending)
+            elif self._stopped:
+                return
+
+    def _requeue(self, releases: dict[str, list[int]]):
+        with self._condition:
+            if self._stopped:
+                # the next check for new releases picks them up again
+                logging.warning(f"Drop new releases {releases} on shutdown")
+                return
+            _merge_releases(self._failed, releases)
+
+
+def _merge_releases(
+    releases: dict[str, list[int]], new_releases: dict[str, list[int]]
+) -> dict[str, list[int]]:
+    for repo_name, release_ids in new_releases.items():
+        known_ids = releases.setdefault(repo_name, [])
+        known_ids.extend(i for i in release_ids if i not in known_ids)
+    return releases
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: "WebhookServer"
+
+    def _respond(self, status: int, message: str = ""):
+        body = message.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa: N802
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        signature = self.headers.get(SIGNATURE_HEADER)
+        if not verify_signature(self.server.secret, body, signature):
+            return self._respond(401, "Invalid signature")
+        if self.headers.get(EVENT_HEADER) != "release":
+            return self._respond(204)
+        try:
+            payload = json.loads(body)
+            action = payload["action"]
+            repo_name = payload["repository"]["name"]
+            org_login = payload["repository"]["owner"]["login"]
+            release_id = int(payload["release"]["id"])
+        except (ValueError, KeyError, TypeError):
+            return self._respond(400, "Invalid release payload")
+        if action not in RELEASE_ACTIONS or not self.server.is_explored(org_login):
+            return self._respond(204)
+        self.server.batcher.add(
+            release_key(org_login, repo_name, self.server.orgs[0]), release_id
+        )
+        self._respond(202, "Accepted")
+
+    def log_message(self, format, *args):  # noqa: A002
+        logging.info(f"{self.address_string()} {format % args}")
+
+
+class WebhookServer(ThreadingHTTPServer):
+    # receives GitHub release webhooks and passes new releases of the explored
+    # orgs to the batcher
+    def __init__(
+        self,
+        address: tuple[str, int],
+        secret: str,
+        batcher: ReleaseBatcher,
+        orgs: Sequence[str] = EXPLORE_ORGS,
+    ):
+        super().__init__(address, WebhookHandler)
+        self.secret = secret
+        self.batcher = batcher
+        self.orgs = list(orgs)
+
+    def is_explored(self, org_login: str) -> bool:
+        return org_login.lower() in {org.lower() for org in self.orgs}
+
+    def serve(self):
+        self.batcher.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            self.batcher.stop()
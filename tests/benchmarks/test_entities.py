@@ -0,0 +1,72 @@
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pytest
+
+from scripts.shell_explorer.entities import Package, Release, Shell1G, Shell2G
+
+RELEASES = 100_000
+RELEASES_PER_REPO = 5
+REPO_CLASSES = (Package, Shell1G, Shell2G)
+
+
+def _make_repos():
+    rnd = random.Random(0)
+    start = datetime(2015, 1, 1)
+    repos = []
+    for i in range(RELEASES // RELEASES_PER_REPO):
+        repo_class = REPO_CLASSES[i % len(REPO_CLASSES)]
+        name = f"Vendor-{i}-Shell"
+        releases = [
+            Release(
+                f"{name} 1.{n}.0",
+                f"1.{n}.0",
+                start + timedelta(days=rnd.randint(0, 2000)),
+                f"https://github.com/QualiSystems/{name}/releases/tag/1.{n}.0",
+                # strings read from YAML are not shared, as in a loaded table
+                "".join(["PY", rnd.choice("23")]),
+            )
+            for n in range(RELEASES_PER_REPO)
+        ]
+        repos.append(
+            repo_class(name, f"https://github.com/QualiSystems/{name}", releases)
+        )
+    return repos
+
+
+@pytest.fixture(scope="module")
+def repos():
+    return _make_repos()
+
+
+@pytest.mark.benchmark(group="entities")
+def test_create(benchmark):
+    tracemalloc.start()
+    _make_repos()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.extra_info["peak_memory_kb"] = peak // 1024
+    benchmark.pedantic(_make_repos, rounds=3)
+
+
+@pytest.mark.benchmark(group="entities")
+def test_repo_lookup(benchmark, repos):
+    table = set(repos)
+    probes = [type(repo)(repo.name) for repo in repos]
+
+    def lookup():
+        return sum(probe in table for probe in probes)
+
+    assert benchmark(lookup) == len(repos)
+
+
+@pytest.mark.benchmark(group="entities")
+def test_release_lookup(benchmark, repos):
+    releases = {release for repo in repos for release in repo.releases}
+    probes = [Release(r.title, r.tag_name) for repo in repos for r in repo.releases]
+
+    def lookup():
+        return sum(probe in releases for probe in probes)
+
+    assert benchmark(lookup) == RELEASES
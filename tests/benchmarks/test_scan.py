@@ -0,0 +1,52 @@
+import os
+import tracemalloc
+from datetime import datetime
+
+import pytest
+
+from scripts.check_for_new_releases.main import get_last_releases
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import make_org
+
+# e.g. SHELL_EXPLORER_BENCH_SIZES=100,1000,20000 pytest tests/benchmarks
+SIZES = [
+    int(size) for size in os.environ.get("SHELL_EXPLORER_BENCH_SIZES", "100").split(",")
+]
+
+
+def _measure(benchmark, github, func):
+    # one run to count API calls and the peak memory, the rest for the time
+    github.api.calls.clear()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    benchmark.extra_info["api_calls"] = github.api.total_calls
+    benchmark.extra_info["api_calls_by_method"] = dict(github.api.calls)
+    benchmark.extra_info["peak_memory_kb"] = peak // 1024
+
+
+@pytest.mark.benchmark(group="scan_and_commit")
+@pytest.mark.parametrize("size", SIZES)
+def test_scan_and_commit(github, benchmark, size):
+    def setup():
+        github.orgs.clear()
+        make_org(github, size)
+        return (ShellExplorer("token", "dev", "{}", rescan_all=True),), {}
+
+    args, _ = setup()
+    _measure(benchmark, github, args[0].scan_and_commit)
+    benchmark.pedantic(ShellExplorer.scan_and_commit, setup=setup, rounds=3)
+
+
+@pytest.mark.benchmark(group="get_last_releases")
+@pytest.mark.parametrize("size", SIZES)
+def test_get_last_releases(github, benchmark, size):
+    org = make_org(github, size)
+    check_from = datetime(2021, 6, 1)
+
+    _measure(benchmark, github, lambda: get_last_releases(org, check_from))
+    releases = benchmark(get_last_releases, org, check_from)
+
+    assert releases
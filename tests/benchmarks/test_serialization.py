@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import pytest
+import yaml
+
+from scripts.shell_explorer.operations import SerializationOperations
+
+SHELLS_FILE = Path(__file__).parents[2] / "shells.yaml"
+
+
+@pytest.fixture(scope="module")
+def shells_data():
+    return SHELLS_FILE.read_text()
+
+
+@pytest.fixture(scope="module")
+def shells_table(shells_data):
+    return SerializationOperations.load_table(shells_data)
+
+
+@pytest.mark.benchmark(group="load shells.yaml")
+def test_load_pure_python(benchmark, shells_data):
+    benchmark(yaml.load, shells_data, Loader=yaml.Loader)
+
+
+@pytest.mark.benchmark(group="load shells.yaml")
+def test_load_table(benchmark, shells_data):
+    benchmark(SerializationOperations.load_table, shells_data)
+
+
+@pytest.mark.benchmark(group="dump shells.yaml")
+def test_dump_pure_python(benchmark, shells_table):
+    benchmark(yaml.dump, shells_table, default_flow_style=False, sort_keys=False)
+
+
+@pytest.mark.benchmark(group="dump shells.yaml")
+def test_dump_table(benchmark, shells_table):
+    benchmark(SerializationOperations.dump_table, shells_table)
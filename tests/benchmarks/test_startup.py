@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = {"github", "yaml", "packaging"}
+COMMANDS = ("explore", "check-new-releases", "serve-webhooks")
+
+
+def _import_times(*args: str) -> dict[str, int]:
+    # cumulative import time of every imported module in microseconds
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "scripts.cli", *args],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and not line.endswith("package"):
+            _, cumulative, name = line[len("import time:") :].split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("command", ((), *((command,) for command in COMMANDS)))
+def test_help_does_not_import_heavy_modules(command):
+    modules = _import_times(*command, "--help")
+
+    assert not HEAVY_MODULES & set(modules)
+    assert "scripts.shell_explorer.shell_explorer" not in modules
+
+
+@pytest.mark.benchmark(group="startup")
+def test_startup(benchmark):
+    modules = benchmark.pedantic(_import_times, ("--help",), rounds=5)
+
+    benchmark.extra_info["modules"] = len(modules)
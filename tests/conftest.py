@@ -0,0 +1,33 @@
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from tests.fake_github import FakeGithub, install
+
+
+def http_response(status, content=b"{}", **headers) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = content
+    r.encoding = "utf-8"
+    return r
+
+
+class FakeSession:
+    # replaces the shared session of GithubConnection, returns the responses in
+    # order and records the requests
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def request(self, verb, url, headers=None, **kwargs):
+        self.requests.append((verb, url, headers))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def github(monkeypatch):
+    github = FakeGithub()
+    install(monkeypatch, github)
+    return github
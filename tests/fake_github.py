@@ -0,0 +1,434 @@
+# in-memory fake of the part of GitHub API used by ShellExplorer and
+# check_for_new_releases, it counts API calls and generates synthetic orgs
+import io
+import itertools
+import random
+import tarfile
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import requests
+from github import InputGitTreeElement, UnknownObjectException
+
+from scripts.shell_explorer.helpers import git_blob_sha
+
+PER_PAGE = 30
+ORG_NAME = "Quali"
+ORG_LOGIN = "QualiSystems"
+WORKING_REPO = "Shell-Explorer"
+CODELOAD_URL = "https://codeload.github.com"
+WORKING_FILES = {
+    "shells.yaml": "[]\n",
+    "packages.yaml": "[]\n",
+    "scan_state.yaml": "{}\n",
+}
+
+
+def _not_found():
+    return UnknownObjectException(404, {"message": "Not Found"}, {})
+
+
+class FakeApi:
+    def __init__(self):
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def call(self, name: str, owner=None):
+        with self._lock:
+            self.calls[name] += 1
+            if owner is not None:
+                owner.calls[name] += 1
+
+    def paginate(self, name: str, items, owner=None):
+        items = list(items)
+        for i, item in enumerate(items):
+            if i % PER_PAGE == 0:
+                self.call(name, owner)
+            yield item
+        if not items:
+            self.call(name, owner)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+
+class FakeRelease:
+    def __init__(self, release_id, tag_name, published_at, html_url, title=None):
+        self.id = release_id
+        self.tag_name = tag_name
+        self.title = title or f"Release {tag_name}"
+        self.published_at = published_at
+        self.html_url = html_url
+
+
+class FakeContent:
+    def __init__(self, path: str, data: str = None, entry_type: str = "file"):
+        self.path = path
+        self.name = path.rsplit("/", 1)[-1]
+        self.type = entry_type
+        self.decoded_content = data.encode("utf-8") if data is not None else None
+        self.sha = git_blob_sha(data) if data is not None else None
+
+
+class FakeWorkflow:
+    def __init__(self, api, repo, runs=()):
+        self._api = api
+        self._repo = repo
+        self.runs = list(runs)
+        self.dispatches = []
+
+    def get_runs(self, branch=None, status=None):
+        runs = [
+            r
+            for r in self.runs
+            if (branch is None or r.head_branch == branch)
+            and (status is None or r.status == status or r.conclusion == status)
+        ]
+        return self._api.paginate("get_workflow_runs", runs, self._repo)
+
+    def create_dispatch(self, ref, inputs):
+        self._api.call("create_dispatch", self._repo)
+        self.dispatches.append((ref, inputs))
+        return True
+
+
+class FakeRepo:
+    def __init__(self, api, org_login, name, files=None, pushed_at=None):
+        self._api = api
+        self.name = name
+        self.full_name = f"{org_login}/{name}"
+        self.html_url = f"https://github.com/{self.full_name}"
+        self.default_branch = "master"
+        self.pushed_at = pushed_at or datetime(2021, 1, 1)
+        self.calls = Counter()
+        self.releases: list[FakeRelease] = []
+        self.workflows: dict[str, FakeWorkflow] = {}
+        # ref (branch, tag or commit sha) -> {path: data}
+        self._refs = {self.default_branch: dict(files or {})}
+        self._branches = {self.default_branch: self.default_branch}
+        self._trees = {}
+        self._blobs = {}
+
+    def add_release(self, tag_name, published_at, files=None, title=None):
+        release = FakeRelease(
+            self._api.next_id(),
+            tag_name,
+            published_at,
+            f"{self.html_url}/releases/tag/{tag_name}",
+            title,
+        )
+        self.releases.insert(0, release)
+        self._refs[tag_name] = dict(files or self._refs[self.default_branch])
+        self.pushed_at = max(self.pushed_at, published_at)
+        return release
+
+    def _files(self, ref=None):
+        ref = ref or self.default_branch
+        ref = self._branches.get(ref, ref)
+        try:
+            return self._refs[ref]
+        except KeyError:
+            raise _not_found()
+
+    def get_releases(self):
+        return self._api.paginate("get_releases", self.releases, self)
+
+    def get_release(self, release_id):
+        self._api.call("get_release", self)
+        for release in self.releases:
+            if release.id == int(release_id):
+                return release
+        raise _not_found()
+
+    def get_contents(self, path, ref=None):
+        self._api.call("get_contents", self)
+        files = self._files(ref)
+        path = path.strip("/")
+        if path in files:
+            return FakeContent(path, files[path])
+        prefix = f"{path}/" if path else ""
+        entries = {}
+        for file_path in files:
+            if file_path.startswith(prefix):
+                name, _, rest = file_path[len(prefix) :].partition("/")
+                entries[name] = "dir" if rest else "file"
+        if not entries:
+            raise _not_found()
+        return [
+            FakeContent(f"{prefix}{name}", files.get(f"{prefix}{name}"), entry_type)
+            for name, entry_type in sorted(entries.items())
+        ]
+
+    def get_archive_link(self, archive_format, ref=None):
+        self._api.call("get_archive_link", self)
+        self._files(ref)
+        return f"{CODELOAD_URL}/{self.full_name}/legacy.tar.gz/{ref}"
+
+    def archive(self, ref) -> bytes:
+        # a tarball like the ones made by GitHub, files are in one directory
+        root = f"{self.full_name.replace('/', '-')}-{ref}"
+        fo = io.BytesIO()
+        with tarfile.open(fileobj=fo, mode="w:gz") as tar:
+            directory = tarfile.TarInfo(root)
+            directory.type = tarfile.DIRTYPE
+            tar.addfile(directory)
+            for path, data in sorted(self._files(ref).items()):
+                content = data.encode("utf-8")
+                member = tarfile.TarInfo(f"{root}/{path}")
+                member.size = len(content)
+                tar.addfile(member, io.BytesIO(content))
+        return fo.getvalue()
+
+    def get_workflow(self, file_name):
+        self._api.call("get_workflow", self)
+        try:
+            return self.workflows[file_name]
+        except KeyError:
+            raise _not_found()
+
+    # git data API used to publish files to the working repo
+    def _tree_sha(self, files) -> str:
+        sha = git_blob_sha(repr(sorted(files.items())))
+        self._trees[sha] = files
+        return sha
+
+    def get_branch(self, branch):
+        self._api.call("get_branch", self)
+        commit_sha = self._branches.get(branch)
+        if commit_sha is None:
+            raise _not_found()
+        tree_sha = self._tree_sha(self._refs[commit_sha])
+        git_commit = SimpleNamespace(tree=SimpleNamespace(sha=tree_sha))
+        return SimpleNamespace(
+            name=branch, commit=SimpleNamespace(sha=commit_sha, commit=git_commit)
+        )
+
+    def get_git_tree(self, sha, recursive=False):
+        # sha can be a ref name too, as in the API
+        self._api.call("get_git_tree", self)
+        files = self._trees.get(sha) or self._files(sha)
+        if recursive:
+            entries = []
+            for path, data in files.items():
+                sha = git_blob_sha(data)
+                self._blobs[sha] = data
+                entries.append(
+                    SimpleNamespace(path=path, sha=sha, type="blob", mode="100644")
+                )
+        else:
+            entries = []
+            for path in sorted({path.split("/", 1)[0] for path in files}):
+                if path in files:
+                    entry = SimpleNamespace(
+                        path=path, sha=git_blob_sha(files[path]), type="blob"
+                    )
+                else:
+                    entry = SimpleNamespace(path=path, sha=None, type="tree")
+                entries.append(entry)
+        return SimpleNamespace(
+            sha=self._tree_sha(files), tree=entries, raw_data={"truncated": False}
+        )
+
+    def create_git_tree(self, elements, base_tree=None):
+        self._api.call("create_git_tree", self)
+        files = dict(self._trees[base_tree.sha]) if base_tree else {}
+        for element in elements:
+            assert isinstance(element, InputGitTreeElement)
+            # the payload sent to the API, files are added by content or sha
+            identity = element._identity
+            if "content" in identity:
+                files[identity["path"]] = identity["content"]
+            else:
+                files[identity["path"]] = self._blobs[identity["sha"]]
+        return SimpleNamespace(sha=self._tree_sha(files))
+
+    def get_git_commit(self, sha):
+        self._api.call("get_git_commit", self)
+        tree_sha = self._tree_sha(self._refs[sha])
+        return SimpleNamespace(sha=sha, tree=SimpleNamespace(sha=tree_sha))
+
+    def create_git_commit(self, message, tree, parents):
+        self._api.call("create_git_commit", self)
+        sha = f"commit-{self._api.next_id()}"
+        self._refs[sha] = self._trees[tree.sha]
+        return SimpleNamespace(sha=sha, message=message, parents=parents)
+
+    def get_git_ref(self, ref):
+        self._api.call("get_git_ref", self)
+        branch = ref.split("/", 1)[1]
+
+        def edit(sha, force=False):
+            self._api.call("edit_git_ref", self)
+            self._branches[branch] = sha
+
+        return SimpleNamespace(
+            ref=f"refs/{ref}",
+            object=SimpleNamespace(sha=self._branches[branch]),
+            edit=edit,
+        )
+
+    def create_branch(self, branch, files):
+        sha = f"commit-{self._api.next_id()}"
+        self._refs[sha] = dict(files)
+        self._branches[branch] = sha
+
+    def branch_files(self, branch) -> dict[str, str]:
+        return self._refs[self._branches[branch]]
+
+
+class FakeOrganization:
+    def __init__(self, api, name=ORG_NAME, login=ORG_LOGIN):
+        self._api = api
+        self.name = name
+        self.login = login
+        self.repos: dict[str, FakeRepo] = {}
+
+    def add_repo(self, name, files=None, pushed_at=None) -> FakeRepo:
+        repo = FakeRepo(self._api, self.login, name, files, pushed_at)
+        self.repos[name] = repo
+        return repo
+
+    def get_repos(self, type=None, sort=None, direction=None):  # noqa: A002
+        repos = list(self.repos.values())
+        if sort in ("pushed", "updated"):
+            repos.sort(key=lambda r: r.pushed_at, reverse=direction != "asc")
+        return self._api.paginate("get_repos", repos)
+
+    def get_repo(self, name):
+        self._api.call("get_repo")
+        try:
+            return self.repos[name]
+        except KeyError:
+            raise _not_found()
+
+
+class FakeGithub:
+    def __init__(self, api=None, orgs=()):
+        self.api = api or FakeApi()
+        self.orgs = {org.login: org for org in orgs}
+        # takes the connection classes in place of the PyGithub requester
+        self._Github__requester = SimpleNamespace()
+
+    def get_user(self):
+        self.api.call("get_user")
+        return SimpleNamespace(
+            get_orgs=lambda: self.api.paginate("get_orgs", self.orgs.values())
+        )
+
+    def get_organization(self, login):
+        self.api.call("get_organization")
+        try:
+            return self.orgs[login]
+        except KeyError:
+            raise _not_found()
+
+
+class FakeDownloads(requests.Session):
+    # serves archives of the fake repos in place of the shared session
+    def __init__(self, github: FakeGithub):
+        super().__init__()
+        self._github = github
+
+    def request(self, method, url, stream=False, **kwargs):
+        path, _, ref = url[len(CODELOAD_URL) + 1 :].partition("/legacy.tar.gz/")
+        login, name = path.split("/")
+        repo = self._github.orgs[login].repos[name]
+        self._github.api.call("download_archive", repo)
+        r = requests.Response()
+        r.status_code = 200
+        r.url = url
+        r.raw = io.BytesIO(repo.archive(ref))
+        return r
+
+
+def install(monkeypatch, github: FakeGithub):
+    def factory(*args, **kwargs):
+        return github
+
+    monkeypatch.setattr("scripts.shell_explorer.operations.Github", factory)
+    monkeypatch.setattr("scripts.check_for_new_releases.main.Github", factory)
+    monkeypatch.setattr(
+        "scripts.shell_explorer.transport.GithubConnection.session",
+        FakeDownloads(github),
+    )
+
+
+SETUP_PY = 'setup(name="{name}", python_requires="{requires}")\n'
+METADATA = '<Driver Name="{name}" PythonVersion="{version}" Version="1.0.0" />\n'
+
+
+def _package_files(name, rnd):
+    requires = rnd.choice([">=2.7", "~=3.7", ">=2.7,<3.0", ">=3.6"])
+    return {
+        "setup.py": SETUP_PY.format(name=name, requires=requires),
+        "README.md": "",
+    }
+
+
+def _shell_files(name, rnd, root_files):
+    files = dict.fromkeys(root_files, "")
+    version = rnd.choice(["2", "3"])
+    files["src/drivermetadata.xml"] = METADATA.format(name=name, version=version)
+    return files
+
+
+KINDS = {
+    "package": (
+        0.10,
+        "cloudshell-package-{i}",
+        lambda name, rnd: _package_files(name, rnd),
+    ),
+    "shell_2g": (
+        0.10,
+        "Vendor-{i}-Shell-2G",
+        lambda name, rnd: _shell_files(name, rnd, ["shell-definition.yaml"]),
+    ),
+    "shell_1g": (
+        0.05,
+        "Vendor-{i}-Shell",
+        lambda name, rnd: _shell_files(name, rnd, ["shell.yml", "deployment.xml"]),
+    ),
+    "shell_l1": (
+        0.03,
+        "cloudshell-L1-Vendor-{i}",
+        lambda name, rnd: {"main.py": "", "README.md": ""},
+    ),
+    "other": (0.72, "project-{i}", lambda name, rnd: {"README.md": ""}),
+}
+
+
+def make_org(
+    github: FakeGithub,
+    size: int,
+    seed: int = 0,
+    releases_per_repo: int = 3,
+    start: datetime = datetime(2021, 1, 1),
+    login: str = ORG_LOGIN,
+) -> FakeOrganization:
+    # only the org with ORG_LOGIN has the working repo
+    rnd = random.Random(seed)
+    org = FakeOrganization(github.api, login=login)
+    github.orgs[org.login] = org
+    kinds = list(KINDS.values())
+    weights = [kind[0] for kind in kinds]
+    for i in range(size):
+        _, name_pattern, files_factory = rnd.choices(kinds, weights)[0]
+        name = name_pattern.format(i=i)
+        repo = org.add_repo(name, files_factory(name, rnd), start)
+        published_at = start
+        for n in range(rnd.randint(0, releases_per_repo)):
+            published_at += timedelta(days=rnd.randint(1, 100))
+            repo.add_release(f"1.{n}.0", published_at, files_factory(name, rnd))
+    if login != ORG_LOGIN:
+        return org
+    working_repo = org.add_repo(WORKING_REPO)
+    working_repo.create_branch("dev", WORKING_FILES)
+    working_repo.create_branch("master", WORKING_FILES)
+    return org
@@ -0,0 +1,70 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from scripts.shell_explorer.catalog import Catalog, dump_catalog
+from scripts.shell_explorer.entities import Package, Release, Shell2G
+from scripts.shell_explorer.operations import SerializationOperations
+
+ROOT = Path(__file__).parent.parent
+
+
+def _load(file_name):
+    return SerializationOperations.load_table((ROOT / file_name).read_text())
+
+
+@pytest.fixture(scope="module")
+def repos():
+    return sorted(_load("shells.yaml")) + sorted(_load("packages.yaml"))
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_published_catalog_matches_tables(repos):
+    assert (ROOT / "catalog.jsonl").read_text() == dump_catalog(repos)
+
+
+def test_every_repo_is_read_back(repos, tmp_path):
+    path = tmp_path / "catalog.jsonl"
+    path.write_text(dump_catalog(repos), encoding="utf-8")
+
+    with Catalog.from_path(path) as catalog:
+        assert len(catalog) == len(repos)
+        for repo in repos:
+            loaded = catalog.get(repo.name)
+            assert loaded == repo
+            assert loaded.url == repo.url
+            assert [r.__getstate__() for r in loaded.releases] == [
+                r.__getstate__() for r in repo.releases
+            ]
+
+
+def test_single_repo_is_read_without_the_rest():
+    releases = [Release("Ünïcode 1.0", "1.0", None, "http://r", "PY3")]
+    repos = [Shell2G(f"Shell-{i}", f"http://{i}", releases) for i in range(1000)]
+    repos.append(Package("cloudshell-foo", "http://foo", releases))
+    fo = CountingReader(dump_catalog(repos).encode("utf-8"))
+    catalog = Catalog(fo)
+    fo.bytes_read = 0
+
+    assert catalog.releases("cloudshell-foo") == releases
+    assert isinstance(catalog.get("cloudshell-foo"), Package)
+    assert fo.bytes_read < 2 * len(dump_catalog(repos[-1:]))
+    assert catalog.get("missing") is None
+    assert catalog.releases("missing") == []
+    assert "Shell-999" in catalog
+
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ValueError):
+        Catalog(io.BytesIO(b'{"version": 0, "index": {}}\n'))
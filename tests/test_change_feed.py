@@ -0,0 +1,129 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from scripts.shell_explorer import change_feed
+from scripts.shell_explorer.change_feed import ChangeFeed
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import SETUP_PY, WORKING_REPO, make_org
+
+
+def _feed_records(files, after=0):
+    # what a consumer that processed records up to `after` reads
+    index = json.loads(files["feed/index.json"])
+    records = []
+    for segment in index["segments"]:
+        if segment["last"] > after:
+            for line in files[segment["path"]].splitlines():
+                records.append(json.loads(line))
+    return [record for record in records if record["seq"] > after]
+
+
+@pytest.fixture
+def org(github):
+    return make_org(github, 60, seed=19)
+
+
+def _scan():
+    ShellExplorer("token", "dev", "{}").scan_and_commit()
+
+
+def test_added_repos_and_releases_are_appended(org):
+    _scan()
+    files = org.repos[WORKING_REPO].branch_files("dev")
+    first = _feed_records(files)
+    package = next(r for r in org.repos.values() if r.name.startswith("cloudshell"))
+    package.add_release(
+        "9.0.0",
+        datetime(2022, 1, 1),
+        {"setup.py": SETUP_PY.format(name=package.name, requires="~=3.7")},
+    )
+    new = org.add_repo("cloudshell-new", {"setup.py": ""})
+    new.add_release(
+        "0.1.0",
+        datetime(2022, 1, 2),
+        {"setup.py": SETUP_PY.format(name=new.name, requires=">=2.7")},
+    )
+
+    _scan()
+
+    files = org.repos[WORKING_REPO].branch_files("dev")
+    assert [r["seq"] for r in first] == list(range(1, len(first) + 1))
+    assert {r["name"] for r in first if r["event"] == "repo"} == {
+        r["name"] for r in first if r["event"] == "release"
+    }
+    assert _feed_records(files, after=len(first)) == [
+        {
+            "seq": len(first) + 1,
+            "event": "release",
+            "name": package.name,
+            "type": "!Package",
+            "title": package.releases[0].title,
+            "tag_name": "9.0.0",
+            "published_at": "2022-01-01T00:00:00",
+            "python_version": "PY3",
+            "release_url": package.releases[0].html_url,
+        },
+        {
+            "seq": len(first) + 2,
+            "event": "repo",
+            "name": new.name,
+            "type": "!Package",
+            "url": new.html_url,
+        },
+        {
+            "seq": len(first) + 3,
+            "event": "release",
+            "name": new.name,
+            "type": "!Package",
+            "title": new.releases[0].title,
+            "tag_name": "0.1.0",
+            "published_at": "2022-01-02T00:00:00",
+            "python_version": "PY2PY3",
+            "release_url": new.releases[0].html_url,
+        },
+    ]
+
+
+def test_unchanged_scan_appends_nothing(org):
+    _scan()
+    before = dict(org.repos[WORKING_REPO].branch_files("dev"))
+    _scan()
+
+    assert org.repos[WORKING_REPO].branch_files("dev") == before
+
+
+def test_segments_are_rotated(org, monkeypatch):
+    monkeypatch.setattr(change_feed, "SEGMENT_SIZE", 4)
+    monkeypatch.setattr(change_feed, "MAX_SEGMENTS", 3)
+    _scan()
+
+    files = org.repos[WORKING_REPO].branch_files("dev")
+    index = json.loads(files["feed/index.json"])
+    segments = [path for path in files if path.startswith("feed/0")]
+    assert sorted(segments) == [segment["path"] for segment in index["segments"]]
+    assert len(segments) == 3
+    assert [len(files[path].splitlines()) for path in segments[:-1]] == [4, 4]
+    assert index["segments"][0]["first"] > 1
+
+
+def test_last_segment_is_continued(monkeypatch):
+    monkeypatch.setattr(change_feed, "SEGMENT_SIZE", 3)
+    files = {}
+    for count in (2, 2, 3):
+        feed = ChangeFeed("feed/index.json", files.get("feed/index.json"))
+        files.update(feed.append([{"n": i} for i in range(count)], files.get))
+
+    assert json.loads(files["feed/index.json"])["segments"] == [
+        {"path": "feed/0000000001.jsonl", "first": 1, "last": 3},
+        {"path": "feed/0000000004.jsonl", "first": 4, "last": 6},
+        {"path": "feed/0000000007.jsonl", "first": 7, "last": 7},
+    ]
+    lines = files["feed/0000000004.jsonl"].splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"seq": 4, "n": 1},
+        {"seq": 5, "n": 0},
+        {"seq": 6, "n": 1},
+    ]
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.check_for_new_releases.main import (
+    SHELL_EXPLORER_WORKFLOW_FILE_NAME,
+    WATERMARK_OVERLAP,
+    WORKFLOW_FILE_NAME,
+    get_last_releases,
+    main,
+)
+from scripts.shell_explorer.transport import AsyncRunner
+
+from tests.fake_github import WORKING_REPO, FakeWorkflow, make_org
+
+
+@pytest.fixture
+def org(github):
+    return make_org(github, 200, seed=3, releases_per_repo=0)
+
+
+def test_only_recently_pushed_repos_are_checked(org):
+    repos = list(org.repos.values())
+    new = [repos[10], repos[20]]
+    for repo in new:
+        repo.add_release("2.0.0", datetime(2021, 6, 2))
+    # pushed without a release
+    repos[30].pushed_at = datetime(2021, 6, 3)
+
+    releases = get_last_releases(org, datetime(2021, 6, 1))
+
+    assert releases == {repo.name: [repo.releases[0].id] for repo in new}
+    checked = [r.name for r in org.repos.values() if r.calls["get_releases"]]
+    assert sorted(checked) == sorted(r.name for r in repos[10:40:10])
+    assert org._api.calls["get_repos"] == 1
+
+
+def test_watermark_is_kept_between_runs(github, org, tmp_path):
+    working_repo = org.repos[WORKING_REPO]
+    last_run = SimpleNamespace(
+        created_at=datetime(2021, 5, 1),
+        head_branch="master",
+        status="completed",
+        conclusion="success",
+    )
+    history = FakeWorkflow(github.api, working_repo, [last_run])
+    dispatch = FakeWorkflow(github.api, working_repo)
+    working_repo.workflows = {
+        WORKFLOW_FILE_NAME: history,
+        SHELL_EXPLORER_WORKFLOW_FILE_NAME: dispatch,
+    }
+    repo = org.repos["project-10"]
+    repo.add_release("2.0.0", datetime(2021, 5, 2))
+    watermark = tmp_path / "watermark"
+
+    main("token", watermark_file=str(watermark))
+
+    assert dispatch.dispatches == [
+        ("master", {"new_releases": f'{{"{repo.name}": [{repo.releases[0].id}]}}'})
+    ]
+    checked_at = datetime.fromisoformat(watermark.read_text())
+    assert datetime.utcnow() - checked_at < timedelta(minutes=1)
+
+    # the next run doesn't read the workflow runs and finds nothing new
+    history.runs.clear()
+    main("token", watermark_file=str(watermark))
+
+    assert len(dispatch.dispatches) == 1
+    assert working_repo.calls["get_workflow_runs"] == 1
+    assert datetime.fromisoformat(watermark.read_text()) > checked_at
+
+
+def test_watermark_overlaps_with_the_last_check(github, org, tmp_path):
+    checked_at = datetime(2021, 6, 1)
+    watermark = tmp_path / "watermark"
+    watermark.write_text(checked_at.isoformat())
+    dispatch = FakeWorkflow(github.api, org.repos[WORKING_REPO])
+    org.repos[WORKING_REPO].workflows[SHELL_EXPLORER_WORKFLOW_FILE_NAME] = dispatch
+    org.repos["project-10"].add_release("2.0.0", checked_at - WATERMARK_OVERLAP / 2)
+
+    main("token", watermark_file=str(watermark))
+
+    assert "project-10" in dispatch.dispatches[0][1]["new_releases"]
+
+
+def test_concurrent_check_matches_serial(org):
+    for repo in list(org.repos.values())[::7]:
+        repo.add_release("2.0.0", datetime(2021, 6, 2))
+
+    serial = get_last_releases(org, datetime(2021, 6, 1))
+    concurrent = get_last_releases(org, datetime(2021, 6, 1), AsyncRunner(8))
+
+    assert concurrent == serial
+    assert list(concurrent) == list(serial)
+    assert len(serial) == 29
@@ -0,0 +1,98 @@
+import pytest
+
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import WORKING_REPO, FakeGithub, install, make_org
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def interval(monkeypatch):
+    monkeypatch.setattr(ShellExplorer.CONFIG, "CHECKPOINT_INTERVAL", 25)
+    return 25
+
+
+def _full_scan(monkeypatch, layout):
+    github = FakeGithub()
+    install(monkeypatch, github)
+    org = make_org(github, 200, seed=11)
+    ShellExplorer("token", "dev", "{}", layout=layout).scan_and_commit()
+    return dict(org.repos[WORKING_REPO].branch_files("dev"))
+
+
+INSPECT = ShellExplorer._inspect_repo_async
+
+
+def _interrupt_after(monkeypatch, count):
+    inspected = []
+
+    async def interrupted_inspect(self, repo, release_ids=None):
+        if len(inspected) == count:
+            raise Interrupted
+        inspected.append(repo.name)
+        return await INSPECT(self, repo, release_ids)
+
+    monkeypatch.setattr(ShellExplorer, "_inspect_repo_async", interrupted_inspect)
+    return inspected
+
+
+@pytest.mark.parametrize("layout", ("single", "sharded"))
+def test_interrupted_scan_is_resumed(monkeypatch, tmp_path, interval, layout):
+    expected = _full_scan(monkeypatch, layout)
+    github = FakeGithub()
+    install(monkeypatch, github)
+    org = make_org(github, 200, seed=11)
+    checkpoint = tmp_path / "checkpoint.yaml"
+
+    def scan(resume):
+        ShellExplorer(
+            "token",
+            "dev",
+            "{}",
+            layout=layout,
+            checkpoint_file=str(checkpoint),
+            resume=resume,
+        ).scan_and_commit()
+
+    first = _interrupt_after(monkeypatch, 110)
+    with pytest.raises(Interrupted):
+        scan(resume=False)
+    second = _interrupt_after(monkeypatch, 60)
+    with pytest.raises(Interrupted):
+        scan(resume=True)
+
+    assert checkpoint.exists()
+    assert org.repos[WORKING_REPO].calls["create_git_commit"] == 0
+
+    third = _interrupt_after(monkeypatch, 1000)
+    scan(resume=True)
+
+    org_repos = list(org.repos)
+    # the repos explored after the last checkpoint are explored again
+    assert second[0] == org_repos[100]
+    assert third[0] == org_repos[150]
+    assert len(first) + len(second) + len(third) == len(org_repos) + 10 + 10
+    assert dict(org.repos[WORKING_REPO].branch_files("dev")) == expected
+    assert not checkpoint.exists()
+
+
+def test_checkpoint_of_another_scan_is_not_used(
+    github, monkeypatch, tmp_path, interval
+):
+    org = make_org(github, 100, seed=11)
+    checkpoint = tmp_path / "checkpoint.yaml"
+
+    _interrupt_after(monkeypatch, 60)
+    with pytest.raises(Interrupted):
+        ShellExplorer(
+            "token", "dev", "{}", checkpoint_file=str(checkpoint)
+        ).scan_and_commit()
+    inspected = _interrupt_after(monkeypatch, 1000)
+    ShellExplorer(
+        "token", "master", "{}", checkpoint_file=str(checkpoint), resume=True
+    ).scan_and_commit()
+
+    assert len(inspected) == len(org.repos)
@@ -0,0 +1,182 @@
+import json
+import random
+from datetime import datetime, timedelta
+from functools import partial
+from types import SimpleNamespace
+
+import pytest
+
+from scripts.check_for_new_releases.dispatch import (
+    DISPATCHED_TTL,
+    DispatchQueue,
+    chunk_releases,
+)
+from scripts.check_for_new_releases.main import (
+    SHELL_EXPLORER_WORKFLOW_FILE_NAME,
+    main,
+    run_shell_explorer_workflow,
+)
+
+from tests.fake_github import WORKING_REPO, FakeWorkflow, make_org
+
+NOW = datetime(2021, 6, 1, 12)
+
+
+@pytest.fixture
+def org(github):
+    return make_org(github, 50, seed=5, releases_per_repo=0)
+
+
+@pytest.fixture
+def dispatch(github, org):
+    dispatch = FakeWorkflow(github.api, org.repos[WORKING_REPO])
+    org.repos[WORKING_REPO].workflows[SHELL_EXPLORER_WORKFLOW_FILE_NAME] = dispatch
+    return dispatch
+
+
+def _dispatched(dispatch):
+    releases = {}
+    for _, inputs in dispatch.dispatches:
+        for name, ids in json.loads(inputs["new_releases"]).items():
+            releases.setdefault(name, []).extend(ids)
+    return releases
+
+
+def test_chunks_are_bounded():
+    rnd = random.Random(1)
+    releases = {
+        f"Repo-{i}-Shell-2G": [
+            rnd.randrange(10**8) for _ in range(rnd.randrange(1, 9))
+        ]
+        for i in range(300)
+    }
+    releases["Busy-Shell-2G"] = list(range(10**7, 10**7 + 500))
+
+    chunks = chunk_releases(releases, max_size=1000)
+
+    assert len(chunks) > 1
+    assert all(len(json.dumps(chunk)) <= 1000 for chunk in chunks)
+    merged = {}
+    for chunk in chunks:
+        for name, ids in chunk.items():
+            merged.setdefault(name, []).extend(ids)
+    assert merged == releases
+    assert chunk_releases({"Foo": [1]}) == [{"Foo": [1]}]
+    assert chunk_releases({}) == []
+
+
+def test_releases_wait_for_the_debounce_window(org, dispatch, tmp_path):
+    path = str(tmp_path / "pending.json")
+    repo = org.repos[WORKING_REPO]
+    debounce = timedelta(minutes=45)
+
+    queue = DispatchQueue(path)
+    queue.add({"Foo": [1]}, NOW)
+    run_shell_explorer_workflow(repo, queue, NOW, debounce)
+    queue.save()
+    queue = DispatchQueue(path)
+    queue.add({"Foo": [1], "Bar": [2]}, NOW + timedelta(minutes=30))
+    run_shell_explorer_workflow(repo, queue, NOW + timedelta(minutes=30), debounce)
+    queue.save()
+
+    assert dispatch.dispatches == []
+
+    queue = DispatchQueue(path)
+    queue.add({}, NOW + timedelta(minutes=90))
+    run_shell_explorer_workflow(repo, queue, NOW + timedelta(minutes=90), debounce)
+    queue.save()
+
+    assert _dispatched(dispatch) == {"Foo": [1], "Bar": [2]}
+    assert DispatchQueue(path).pending == {}
+
+
+def test_max_delay_limits_the_debounce(org, dispatch, tmp_path):
+    queue = DispatchQueue(str(tmp_path / "pending.json"))
+    repo = org.repos[WORKING_REPO]
+    for minutes in range(0, 150, 30):
+        now = NOW + timedelta(minutes=minutes)
+        queue.add({"Foo": [minutes]}, now)
+        run_shell_explorer_workflow(
+            repo, queue, now, timedelta(minutes=45), timedelta(hours=2)
+        )
+
+    assert _dispatched(dispatch) == {"Foo": [0, 30, 60, 90, 120]}
+
+
+def test_dispatch_is_postponed_while_a_run_is_in_flight(org, dispatch, tmp_path):
+    queue = DispatchQueue(str(tmp_path / "pending.json"))
+    repo = org.repos[WORKING_REPO]
+    dispatch.runs.append(
+        SimpleNamespace(head_branch="master", status="in_progress", conclusion=None)
+    )
+
+    queue.add({"Foo": [1]}, NOW)
+    run_shell_explorer_workflow(repo, queue, NOW)
+
+    assert dispatch.dispatches == []
+
+    dispatch.runs[0].status = "completed"
+    run_shell_explorer_workflow(repo, queue, NOW + timedelta(minutes=30))
+
+    assert _dispatched(dispatch) == {"Foo": [1]}
+
+
+def test_overdue_dispatch_waits_for_a_run_in_flight(org, dispatch, tmp_path):
+    queue = DispatchQueue(str(tmp_path / "pending.json"))
+    repo = org.repos[WORKING_REPO]
+    dispatch.runs.append(
+        SimpleNamespace(head_branch="master", status="queued", conclusion=None)
+    )
+
+    queue.add({"Foo": [1]}, NOW)
+    run_shell_explorer_workflow(repo, queue, NOW + timedelta(hours=3))
+
+    assert dispatch.dispatches == []
+    assert queue.pending == {"Foo": [1]}
+
+
+def test_dispatched_releases_are_not_dispatched_again(org, dispatch, tmp_path):
+    path = str(tmp_path / "pending.json")
+    repo = org.repos[WORKING_REPO]
+
+    for now in (NOW, NOW + timedelta(minutes=30), NOW + DISPATCHED_TTL * 2):
+        queue = DispatchQueue(path)
+        queue.add({"Foo": [1, 2]}, now)
+        run_shell_explorer_workflow(repo, queue, now)
+        queue.save()
+
+    assert [json.loads(d[1]["new_releases"]) for d in dispatch.dispatches] == [
+        {"Foo": [1, 2]},
+        {"Foo": [1, 2]},
+    ]
+
+
+def test_check_dispatches_chunks(org, dispatch, tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        "scripts.check_for_new_releases.main.chunk_releases",
+        partial(chunk_releases, max_size=200),
+    )
+    watermark = tmp_path / "watermark"
+    watermark.write_text(datetime(2021, 6, 1).isoformat())
+    repos = [r for r in org.repos.values() if r.name != WORKING_REPO][:20]
+    for repo in repos:
+        repo.add_release("2.0.0", datetime(2021, 6, 2))
+    pending = tmp_path / "pending.json"
+
+    main("token", watermark_file=str(watermark), pending_file=str(pending))
+
+    # one chunk is dispatched per check, the rest stay pending
+    assert len(dispatch.dispatches) == 1
+    assert DispatchQueue(str(pending)).pending
+
+    # the overlap of the next checks finds the same releases
+    checks = 1
+    while DispatchQueue(str(pending)).pending:
+        watermark.write_text(datetime(2021, 6, 1).isoformat())
+        main("token", watermark_file=str(watermark), pending_file=str(pending))
+        checks += 1
+
+    assert len(dispatch.dispatches) == checks > 1
+    dispatched = [json.loads(d[1]["new_releases"]) for d in dispatch.dispatches]
+    assert all(len(json.dumps(chunk)) <= 200 for chunk in dispatched)
+    assert _dispatched(dispatch) == {r.name: [r.releases[0].id] for r in repos}
@@ -1,4 +1,5 @@
 import datetime
+import sys
 
 import yaml
 
@@ -53,3 +54,34 @@ def test_entities():
     loaded = yaml.load(dump, Loader=yaml.Loader)
 
     assert loaded == shells
+
+
+def test_replaced_releases_mark_repo_changed():
+    release = Release("Test Rel1", "1.2.3", datetime.datetime.now(), "http://a", "PY2")
+    dump = yaml.dump([Shell2G("Test Shell", "http://b", [release])])
+
+    shell = yaml.load(dump, Loader=yaml.Loader)[0]
+    assert shell.releases == [release]
+    assert not shell.changed
+
+    shell.releases = [release]
+    assert shell.changed
+    assert yaml.dump([shell]) == dump
+
+
+def test_entities_have_no_instance_dict():
+    release = Release("Test Rel1", "1.2.3", python_version="".join(["PY", "3"]))
+    shell = Shell2G("Test Shell", releases=[release])
+
+    assert not hasattr(release, "__dict__")
+    assert not hasattr(shell, "__dict__")
+    assert release.python_version is sys.intern("PY3")
+
+
+def test_repo_hash_depends_on_type_and_name():
+    names = [f"Vendor-{i}-Shell" for i in range(1000)]
+    hashes = {hash(cls(name)) for cls in (Shell1G, Shell2G, ShellL1) for name in names}
+
+    assert len(hashes) == 3000
+    assert Shell2G("a") != Shell1G("a")
+    assert len({Release("a", "bc"), Release("ab", "c")}) == 2
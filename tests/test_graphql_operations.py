@@ -0,0 +1,187 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from github import UnknownObjectException
+
+from scripts.shell_explorer.graphql_operations import GraphQLRepoOperations
+from scripts.shell_explorer.operations import SerializationOperations
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+SETUP_PY = 'setup(name="cloudshell-foo", python_requires=">=2.7")'
+
+
+def _repo_node(name, root, tag=None, setup_py=None, metadata=None):
+    def blob(text):
+        return (
+            {"object": {"oid": f"{name}-{len(text)}", "text": text}} if text else None
+        )
+
+    releases = []
+    if tag:
+        releases.append(
+            {
+                "databaseId": 100,
+                "name": f"{name} {tag}",
+                "tagName": tag,
+                "publishedAt": "2021-05-01T10:00:00Z",
+                "url": f"https://github.com/QualiSystems/{name}/releases/tag/{tag}",
+                "tagCommit": {"setupPy": blob(setup_py), "metadata": blob(metadata)},
+            }
+        )
+    return {
+        "name": name,
+        "url": f"https://github.com/QualiSystems/{name}",
+        "object": {"oid": f"{name}-root", "entries": [{"name": n} for n in root]},
+        "releases": {"nodes": releases},
+    }
+
+
+PAGES = [
+    [
+        _repo_node("cloudshell-foo", ["setup.py"], "1.0.0", setup_py=SETUP_PY),
+        _repo_node(
+            "Foo-Shell-2G",
+            ["shell-definition.yaml", "src"],
+            "2.0.0",
+            metadata='PythonVersion="3" \n',
+        ),
+    ],
+    [_repo_node("docs", ["README.md"]), _repo_node("cloudshell-bar", ["setup.py"])],
+]
+
+
+class GraphQLStubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):  # noqa: N802
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.queries.append(body)
+        assert self.headers["Authorization"] == "bearer token"
+        page = int(body["variables"]["after"] or 0)
+        data = {
+            "organization": {
+                "repositories": {
+                    "pageInfo": {
+                        "hasNextPage": page + 1 < len(PAGES),
+                        "endCursor": str(page + 1),
+                    },
+                    "nodes": PAGES[page],
+                }
+            }
+        }
+        payload = json.dumps({"data": data}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def graphql_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphQLStubHandler)
+    server.queries = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def operations(graphql_server):
+    host, port = graphql_server.server_address
+    ops = GraphQLRepoOperations(
+        "token",
+        "QualiSystems",
+        "Shell-Explorer",
+        releases_depth=3,
+        graphql_url=f"http://{host}:{port}/graphql",
+    )
+    return ops
+
+
+def test_repos_are_fetched_in_batches(operations, graphql_server):
+    repos = list(operations.get_org_repos("QualiSystems"))
+
+    assert [r.name for r in repos] == [
+        "cloudshell-foo",
+        "Foo-Shell-2G",
+        "docs",
+        "cloudshell-bar",
+    ]
+    assert len(graphql_server.queries) == 2
+    variables = graphql_server.queries[0]["variables"]
+    assert variables["org"] == "QualiSystems"
+    assert variables["releases"] == 3 * GraphQLRepoOperations.RELEASES_OVERFETCH
+    assert variables["first"] == GraphQLRepoOperations.BATCH_SIZE
+
+
+def test_repo_snapshot(operations):
+    repo = next(iter(operations.get_org_repos("QualiSystems")))
+    release = repo.get_releases()[0]
+
+    assert {c.name for c in repo.get_contents("")} == {"setup.py"}
+    tree = repo.get_git_tree(repo.default_branch)
+    assert (tree.sha, [e.path for e in tree.tree]) == (
+        "cloudshell-foo-root",
+        ["setup.py"],
+    )
+    assert release.tag_name == "1.0.0"
+    assert release.published_at.year == 2021
+    assert repo.get_release(100) is release
+    content = repo.get_contents("setup.py", "1.0.0")
+    assert content.decoded_content.decode() == SETUP_PY
+    with pytest.raises(UnknownObjectException):
+        repo.get_contents("/src/drivermetadata.xml", "1.0.0")
+
+
+def test_scan_with_graphql_backend(operations, graphql_server):
+    committed = {}
+
+    def get_working_content(branch, path):
+        if path not in ("shells.yaml", "packages.yaml"):
+            raise UnknownObjectException(404, {"message": "Not Found"}, {})
+        return "[]\n"
+
+    operations.get_working_content = get_working_content
+    operations.commit_if_changed = lambda files, branch: committed.update(files)
+    se = ShellExplorer("token", "dev", "{}")
+    se.repo_operations = operations
+
+    se.scan_and_commit()
+
+    shells = SerializationOperations.load_table(committed["shells.yaml"])
+    packages = SerializationOperations.load_table(committed["packages.yaml"])
+    assert [(s.name, s.releases[0].python_version) for s in shells] == [
+        ("Foo-Shell-2G", "PY3")
+    ]
+    assert [(p.name, p.releases[0].python_version) for p in packages] == [
+        ("cloudshell-foo", "PY2PY3")
+    ]
+    assert len(graphql_server.queries) == 2
+
+
+def test_drafts_do_not_take_places_of_published_releases(operations):
+    node = _repo_node("cloudshell-foo", ["setup.py"])
+    for i, published_at in enumerate(
+        (None, None, "2021-05-04T10:00:00Z", None, "2021-05-03T10:00:00Z")
+        + ("2021-05-02T10:00:00Z", "2021-05-01T10:00:00Z")
+    ):
+        node["releases"]["nodes"].append(
+            {
+                "databaseId": i,
+                "name": f"1.{i}.0",
+                "tagName": f"1.{i}.0",
+                "publishedAt": published_at,
+                "url": f"https://github.com/QualiSystems/cloudshell-foo/{i}",
+                "tagCommit": None,
+            }
+        )
+
+    repo = operations._repo_snapshot(node)
+
+    assert [r.id for r in repo.get_releases()] == [2, 4, 5]
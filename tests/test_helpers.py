@@ -4,6 +4,8 @@ from scripts.shell_explorer.helpers import (
     PyVersion,
     get_package_python_version,
     get_python_requires_str,
+    git_blob_sha,
+    write_file_atomically,
 )
 
 
@@ -183,3 +185,23 @@ setup(
 )
 def test_get_package_python_version(setup_content, python_version):
     assert get_package_python_version(setup_content) == python_version
+
+
+@pytest.mark.parametrize(
+    ("data", "sha"),
+    (
+        ("", "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"),
+        ("hello\n", "ce013625030ba8dba906f756967f9e9ca394464a"),
+    ),
+)
+def test_git_blob_sha(data, sha):
+    assert git_blob_sha(data) == sha
+
+
+def test_write_file_atomically(tmp_path):
+    path = tmp_path / "state" / "watermark.txt"
+    write_file_atomically(str(path), "old")
+    write_file_atomically(path, "new")
+
+    assert path.read_text() == "new"
+    assert [p.name for p in path.parent.iterdir()] == ["watermark.txt"]
@@ -0,0 +1,98 @@
+import pytest
+
+from scripts.shell_explorer.http_cache import CachedResponse, ResponseCache
+from scripts.shell_explorer.transport import GithubConnection
+
+from tests.conftest import FakeSession, http_response
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path)
+    monkeypatch.setattr(GithubConnection, "cache", cache)
+    monkeypatch.setattr(GithubConnection, "scheduler", None)
+    return cache
+
+
+def _get(url="/repos/org/repo/releases", verb="GET"):
+    cnx = GithubConnection("api.github.com")
+    cnx.request(verb, url, None, {"Authorization": "token abc"})
+    return cnx.getresponse()
+
+
+def test_revalidated_response_is_served_from_cache(cache, monkeypatch):
+    session = FakeSession(
+        [
+            http_response(
+                200, b'[{"id": 1}]', ETag='"v1"', **{"X-RateLimit-Remaining": "9"}
+            ),
+            http_response(304, ETag='"v1"', **{"X-RateLimit-Remaining": "8"}),
+        ]
+    )
+    monkeypatch.setattr(GithubConnection, "session", session)
+
+    first = _get()
+    second = _get()
+
+    assert first.read() == second.read() == '[{"id": 1}]'
+    assert second.status == 200
+    assert dict(second.getheaders())["x-ratelimit-remaining"] == "8"
+    assert "If-None-Match" not in session.requests[0][2]
+    assert session.requests[1][2]["If-None-Match"] == '"v1"'
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_response_replaces_entry(cache, monkeypatch):
+    session = FakeSession(
+        [
+            http_response(200, b"old", **{"Last-Modified": "Mon, 01 Mar 2021"}),
+            http_response(200, b"new", **{"Last-Modified": "Tue, 02 Mar 2021"}),
+            http_response(304),
+        ]
+    )
+    monkeypatch.setattr(GithubConnection, "session", session)
+
+    _get()
+    assert _get().read() == "new"
+    assert _get().read() == "new"
+    assert session.requests[2][2]["If-Modified-Since"] == "Tue, 02 Mar 2021"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_not_get_requests_are_not_cached(cache, monkeypatch):
+    session = FakeSession([http_response(201, b"{}", ETag='"v1"')])
+    monkeypatch.setattr(GithubConnection, "session", session)
+
+    _get(verb="POST")
+
+    assert cache.size == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_eviction_keeps_cache_under_max_size(tmp_path):
+    cache = ResponseCache(tmp_path, max_size=1000)
+    for i in range(10):
+        cache.put(str(i), CachedResponse(200, {"etag": str(i)}, "x" * 300))
+
+    assert cache.size <= 1000
+    assert cache.get("9").read() == "x" * 300
+    assert cache.get("0") is None
+    assert ResponseCache(tmp_path).size == cache.size
+
+
+def test_key_depends_on_token():
+    url = "https://api.github.com/repos/org/repo"
+    assert ResponseCache.key(url, {"Authorization": "token a"}) != ResponseCache.key(
+        url, {"Authorization": "token b"}
+    )
+
+
+def test_eviction_keeps_other_files(tmp_path):
+    pending = tmp_path / "check-for-new-releases.pending.json"
+    pending.write_text("{}")
+    cache = ResponseCache(tmp_path, max_size=1000)
+    for i in range(10):
+        cache.put(str(i), CachedResponse(200, {"etag": str(i)}, "x" * 300))
+
+    assert pending.read_text() == "{}"
+    assert ResponseCache(tmp_path).size == cache.size
@@ -0,0 +1,123 @@
+import os
+import subprocess
+from datetime import datetime
+
+import pytest
+
+from scripts.shell_explorer.mirror_operations import GitMirror, MirrorRepoOperations
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import METADATA, WORKING_REPO, FakeOrganization, make_org
+
+TABLES = ("shells.yaml", "packages.yaml", "catalog.jsonl")
+
+
+def _git(cwd, *args, date=None):
+    env = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+    if date:
+        stamp = f"@{int((date - datetime(1970, 1, 1)).total_seconds())} +0000"
+        env.update(GIT_AUTHOR_DATE=stamp, GIT_COMMITTER_DATE=stamp)
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@test", *args],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        check=True,
+    )
+
+
+def _commit(work, files, date):
+    _git(work, "rm", "-rq", "--ignore-unmatch", ".")
+    for path, data in files.items():
+        os.makedirs(os.path.dirname(os.path.join(work, path)), exist_ok=True)
+        with open(os.path.join(work, path), "w") as fo:
+            fo.write(data)
+    _git(work, "add", "-A")
+    _git(work, "commit", "-q", "--allow-empty", "-m", "commit", date=date)
+
+
+def _mirror(repo, tmp_path):
+    # a bare clone of a fake repo, tags are its releases
+    work = tmp_path / "work" / repo.name
+    work.mkdir(parents=True)
+    _git(work, "init", "-q", "-b", repo.default_branch)
+    for release in reversed(repo.releases):
+        _commit(work, repo._files(release.tag_name), release.published_at)
+        _git(work, "tag", release.tag_name)
+    _commit(work, repo._files(), repo.pushed_at)
+    _git(tmp_path, "clone", "-q", "--bare", str(work), f"mirrors/{repo.name}.git")
+    return tmp_path / "mirrors" / f"{repo.name}.git"
+
+
+def test_mirror_scan_matches_rest_scan(github, tmp_path):
+    org = make_org(github, 40, seed=17)
+    for repo in org.repos.values():
+        if repo.name != WORKING_REPO:
+            _mirror(repo, tmp_path)
+    ShellExplorer("token", "dev", "{}").scan_and_commit()
+    rest = org.repos[WORKING_REPO].branch_files("dev")
+    for repo in org.repos.values():
+        repo.calls.clear()
+
+    # a rescan of the tables made through the API changes nothing, the known
+    # releases keep their titles, which differ from the tags
+    ShellExplorer(
+        "token",
+        "dev",
+        "{}",
+        rescan_all=True,
+        backend="mirror",
+        mirror_dir=str(tmp_path / "mirrors"),
+    ).scan_and_commit()
+
+    mirror = org.repos[WORKING_REPO].branch_files("dev")
+    assert {name: mirror[name] for name in TABLES} == {
+        name: rest[name] for name in TABLES
+    }
+    explored = [
+        r.name for r in org.repos.values() if r.calls and r.name != WORKING_REPO
+    ]
+    assert explored == []
+
+
+def test_mirror_reads_tags_root_and_files(github, tmp_path):
+    org = FakeOrganization(github.api)
+    repo = org.add_repo("Foo-Shell-2G", {"shell-definition.yaml": "", "src/a.py": ""})
+    metadata = METADATA.format(name="Foo-Shell-2G", version="3")
+    repo.add_release("1.0.0", datetime(2021, 1, 2))
+    repo.add_release(
+        "1.1.0",
+        datetime(2021, 1, 3),
+        {"shell-definition.yaml": "", "src/drivermetadata.xml": metadata},
+    )
+    mirror = GitMirror(_mirror(repo, tmp_path))
+
+    tags = mirror.tags()
+    blobs = mirror.blobs(
+        [f"refs/tags/{name}:src/drivermetadata.xml" for name, _, _ in tags]
+    )
+
+    assert [(name, date) for name, _, date in tags] == [
+        ("1.1.0", datetime(2021, 1, 3)),
+        ("1.0.0", datetime(2021, 1, 2)),
+    ]
+    assert mirror.root()[1] == ["shell-definition.yaml", "src"]
+    assert mirror.pushed_at() == datetime(2021, 1, 3)
+    assert [text for _, text in blobs.values()] == [metadata]
+
+
+def test_only_the_first_org_uses_the_mirror_dir(github, tmp_path):
+    org = make_org(github, 10, seed=1)
+    repo = next(r for name, r in org.repos.items() if name != WORKING_REPO)
+    _mirror(repo, tmp_path)
+    operations = MirrorRepoOperations(
+        "token",
+        org.login,
+        WORKING_REPO,
+        mirror_dir=str(tmp_path / "mirrors"),
+        root_org=org.login,
+    )
+
+    assert [r.name for r in operations.get_org_repos(org.login)] == [repo.name]
+    with pytest.raises(FileNotFoundError):
+        list(operations.get_org_repos("QualiLabs"))
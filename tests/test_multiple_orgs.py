@@ -0,0 +1,110 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from scripts.check_for_new_releases.main import get_orgs_last_releases
+from scripts.shell_explorer.catalog import Catalog
+from scripts.shell_explorer.helpers import release_key, split_release_key
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import METADATA, ORG_LOGIN, WORKING_REPO, make_org
+
+OTHER_ORG = "QualiLabs"
+ORGS = [ORG_LOGIN, OTHER_ORG]
+
+
+@pytest.fixture
+def orgs(github):
+    org = make_org(github, 60, seed=7)
+    other_org = make_org(github, 0, login=OTHER_ORG)
+    files = {
+        "shell-definition.yaml": "",
+        "src/drivermetadata.xml": METADATA.format(name="Bar", version="3"),
+    }
+    for repo in (
+        org.add_repo("Foo-Shell-2G", files),
+        other_org.add_repo("Foo-Shell-2G", files),
+        other_org.add_repo("Bar-Shell-2G", files),
+    ):
+        repo.add_release("1.0.0", datetime(2021, 3, 1), files)
+    return org, other_org
+
+
+def _catalog(org) -> Catalog:
+    data = org.repos[WORKING_REPO].branch_files("dev")["catalog.jsonl"]
+    return Catalog(io.BytesIO(data.encode()))
+
+
+def test_release_keys():
+    assert release_key("qualisystems", "Foo", ORG_LOGIN) == "Foo"
+    assert release_key(OTHER_ORG, "Foo", ORG_LOGIN) == f"{OTHER_ORG}/Foo"
+    assert split_release_key("Foo", ORG_LOGIN) == (ORG_LOGIN, "Foo")
+    assert split_release_key(f"{OTHER_ORG}/Foo", ORG_LOGIN) == (OTHER_ORG, "Foo")
+
+
+def test_orgs_are_merged_into_one_catalog(github, orgs):
+    org, other_org = orgs
+
+    ShellExplorer("token", "dev", "{}", workers=4, orgs=ORGS).scan_and_commit()
+
+    catalog = _catalog(org)
+    assert catalog.get("Bar-Shell-2G").url == other_org.repos["Bar-Shell-2G"].html_url
+    # a repo name taken in the first org is not explored in the others
+    assert catalog.get("Foo-Shell-2G").url == org.repos["Foo-Shell-2G"].html_url
+    assert not other_org.repos["Foo-Shell-2G"].calls["get_releases"]
+    # orgs are looked up by login, the orgs of the user are not listed
+    assert github.api.calls["get_organization"] == len(ORGS)
+    assert not github.api.calls["get_orgs"]
+
+
+def test_new_releases_of_other_orgs(github, orgs):
+    org, other_org = orgs
+    repo = other_org.repos["Bar-Shell-2G"]
+    new_releases = {f"{OTHER_ORG}/Bar-Shell-2G": [repo.releases[0].id]}
+
+    ShellExplorer("token", "dev", json.dumps(new_releases), orgs=ORGS).scan_and_commit()
+
+    assert _catalog(org).names() == ["Bar-Shell-2G"]
+
+
+def test_new_releases_of_names_taken_in_the_first_org(github, orgs):
+    # the keys of the check and the webhooks are explored as in the full scan
+    org, other_org = orgs
+    repo = other_org.repos["Foo-Shell-2G"]
+    new_releases = {
+        f"{OTHER_ORG}/Foo-Shell-2G": [repo.releases[0].id],
+        f"{OTHER_ORG}/Bar-Shell-2G": [other_org.repos["Bar-Shell-2G"].releases[0].id],
+    }
+
+    ShellExplorer("token", "dev", json.dumps(new_releases), orgs=ORGS).scan_and_commit()
+
+    assert _catalog(org).names() == ["Bar-Shell-2G"]
+    assert not repo.calls["get_releases"]
+
+
+def test_last_releases_of_names_taken_in_the_first_org(github, orgs):
+    org, other_org = orgs
+    repo = other_org.repos["Foo-Shell-2G"]
+    repo.add_release("2.0.0", datetime(2022, 1, 1))
+    repo.pushed_at = datetime(2022, 1, 1)
+
+    assert get_orgs_last_releases([org, other_org], datetime(2021, 12, 1)) == {}
+
+
+def test_last_releases_of_orgs(github, orgs):
+    org, other_org = orgs
+    repo = org.repos["Foo-Shell-2G"]
+    release = repo.add_release("2.0.0", datetime(2022, 1, 1))
+    repo.pushed_at = datetime(2022, 1, 1)
+    other_repo = other_org.repos["Bar-Shell-2G"]
+    other_release = other_repo.add_release("2.0.0", datetime(2022, 1, 2))
+    other_repo.pushed_at = datetime(2022, 1, 2)
+
+    releases = get_orgs_last_releases([org, other_org], datetime(2021, 12, 1))
+
+    assert releases == {
+        "Foo-Shell-2G": [release.id],
+        f"{OTHER_ORG}/Bar-Shell-2G": [other_release.id],
+    }
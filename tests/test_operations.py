@@ -0,0 +1,139 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import yaml
+
+from scripts.shell_explorer.helpers import git_blob_sha
+from scripts.shell_explorer.operations import RepoOperations, SerializationOperations
+
+ROOT = Path(__file__).parent.parent
+
+FILES = {"shells.yaml": "- shells\n", "packages.yaml": "- packages\n"}
+
+
+class FakeWorkingRepo:
+    def __init__(self, files):
+        self.tree = [
+            SimpleNamespace(
+                path=path, sha=git_blob_sha(data), type="blob", mode="100644"
+            )
+            for path, data in files.items()
+        ]
+        self.calls = []
+        self.new_tree = None
+        self.base_tree = None
+        self.ref_sha = None
+        self.truncated = False
+
+    def get_git_tree(self, sha, recursive=False):
+        self.calls.append("get_git_tree")
+        return SimpleNamespace(
+            sha=sha, tree=self.tree, raw_data={"truncated": self.truncated}
+        )
+
+    def get_contents(self, path, ref=None):
+        raise AssertionError("files must not be downloaded")
+
+    def create_git_tree(self, elements, base_tree=None):
+        self.calls.append("create_git_tree")
+        # the payload sent to the API
+        self.new_tree = [e._identity for e in elements]
+        self.base_tree = base_tree
+        return SimpleNamespace(sha="new-tree")
+
+    def get_git_commit(self, sha):
+        self.calls.append("get_git_commit")
+        return SimpleNamespace(sha=sha, tree=SimpleNamespace(sha="tree-sha"))
+
+    def create_git_commit(self, message, tree, parents):
+        self.calls.append("create_git_commit")
+        assert [p.sha for p in parents] == ["head"]
+        return SimpleNamespace(sha="new-commit", message=message)
+
+    def get_git_ref(self, ref):
+        self.calls.append("get_git_ref")
+        assert ref == "heads/dev"
+        return SimpleNamespace(
+            object=SimpleNamespace(sha="head"),
+            edit=lambda sha: setattr(self, "ref_sha", sha),
+        )
+
+
+@pytest.fixture
+def working_repo(monkeypatch):
+    repo = FakeWorkingRepo(FILES)
+    monkeypatch.setattr(RepoOperations, "working_repo", repo)
+    return repo
+
+
+def test_nothing_is_committed_without_changes(working_repo):
+    operations = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+
+    assert operations.commit_if_changed(dict(FILES), "dev") is None
+    assert working_repo.calls == ["get_git_ref", "get_git_commit", "get_git_tree"]
+
+
+def test_changed_files_are_committed_at_once(working_repo):
+    operations = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+    files = {**FILES, "packages.yaml": "- new\n", "scan_state.yaml": "{}\n"}
+
+    commit = operations.commit_if_changed(files, "dev")
+
+    assert working_repo.new_tree == [
+        {
+            "path": "packages.yaml",
+            "mode": "100644",
+            "type": "blob",
+            "content": "- new\n",
+        },
+        {
+            "path": "scan_state.yaml",
+            "mode": "100644",
+            "type": "blob",
+            "content": "{}\n",
+        },
+    ]
+    assert working_repo.base_tree.sha == "tree-sha"
+    assert working_repo.calls.count("create_git_commit") == 1
+    assert working_repo.calls.count("get_git_commit") == 1
+    assert working_repo.ref_sha == commit.sha == "new-commit"
+
+
+def test_removed_files_are_left_out_of_the_tree(working_repo):
+    operations = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+
+    operations.commit_if_changed({**FILES, "shells.yaml": None}, "dev")
+
+    # no null sha, the tree is made from the kept files only
+    assert working_repo.new_tree == [
+        {
+            "path": "packages.yaml",
+            "mode": "100644",
+            "type": "blob",
+            "sha": git_blob_sha(FILES["packages.yaml"]),
+        }
+    ]
+    assert working_repo.base_tree is None
+
+
+def test_files_are_not_removed_from_a_truncated_tree(working_repo):
+    operations = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+    working_repo.truncated = True
+
+    with pytest.raises(ValueError, match="truncated"):
+        operations.commit_if_changed({**FILES, "shells.yaml": None}, "dev")
+
+    assert "create_git_tree" not in working_repo.calls
+    assert working_repo.ref_sha is None
+
+
+@pytest.mark.parametrize("file_name", ("shells.yaml", "packages.yaml"))
+def test_serialization_matches_pure_python_yaml(file_name):
+    data = (ROOT / file_name).read_text()
+
+    table = SerializationOperations.load_table(data)
+
+    assert table == yaml.load(data, Loader=yaml.Loader)
+    assert SerializationOperations.dump_table(table) == data
+    assert yaml.dump(table, default_flow_style=False, sort_keys=False) == data
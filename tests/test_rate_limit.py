@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from scripts.shell_explorer.rate_limit import BACKOFF_BASE, RequestScheduler
+from scripts.shell_explorer.transport import GithubConnection
+
+from tests.conftest import FakeSession, http_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    return RequestScheduler(
+        max_rate=10, burst=5, clock=clock, wall_clock=clock, sleep=clock.sleep
+    )
+
+
+def _budget(remaining, limit=5000, reset=4600):
+    return {
+        "x-ratelimit-remaining": str(remaining),
+        "x-ratelimit-limit": str(limit),
+        "x-ratelimit-reset": str(reset),
+    }
+
+
+def test_token_bucket_paces_requests(scheduler, clock):
+    for _ in range(15):
+        scheduler.acquire()
+
+    # burst of 5 requests, then 10 more at 10 requests per second
+    assert clock.now == pytest.approx(1001.0)
+    assert scheduler.calls["default"] == 15
+
+
+def test_rate_is_spread_over_the_reset_window(scheduler, clock):
+    scheduler.update(_budget(4000))
+    assert scheduler.rate == 10
+
+    scheduler.update(_budget(1800, reset=int(clock.now) + 3600))
+    assert scheduler.rate == pytest.approx(0.5)
+
+    scheduler.update({**_budget(10, limit=100), "x-ratelimit-resource": "graphql"})
+    assert scheduler.rate == pytest.approx(10 / 3600)
+
+
+@pytest.mark.parametrize(
+    ("status", "headers", "body", "delay"),
+    (
+        (429, {"retry-after": "30"}, "", 30),
+        (403, _budget(0, reset=1100), "API rate limit exceeded", 101),
+        (403, _budget(10), "You have exceeded a secondary rate limit", BACKOFF_BASE),
+        (403, _budget(10), "Resource not accessible by integration", None),
+        (404, {}, "Not Found", None),
+    ),
+)
+def test_backoff(scheduler, clock, status, headers, body, delay):
+    assert scheduler.backoff(status, headers, body, 0) == delay
+    if delay:
+        scheduler.acquire()
+        assert clock.now == 1000 + delay
+        assert scheduler.retries["default"] == 1
+
+
+def test_backoff_gives_up_after_max_retries(scheduler):
+    assert scheduler.backoff(429, {}, "", 4) == BACKOFF_BASE * 16
+    assert scheduler.backoff(429, {}, "", 5) is None
+
+
+def test_calls_are_counted_per_phase(scheduler):
+    with scheduler.use_phase("explore"):
+        scheduler.acquire()
+        scheduler.acquire()
+    scheduler.acquire()
+
+    assert scheduler.calls == {"explore": 2, "default": 1}
+
+
+def test_connection_retries_throttled_requests(scheduler, clock, monkeypatch):
+    session = FakeSession(
+        [http_response(429, **{"Retry-After": "5"}), http_response(200)]
+    )
+    monkeypatch.setattr(GithubConnection, "session", session)
+    monkeypatch.setattr(GithubConnection, "scheduler", scheduler)
+    monkeypatch.setattr(GithubConnection, "cache", None)
+
+    cnx = GithubConnection("api.github.com")
+    cnx.request("GET", "/orgs/QualiSystems", None, {})
+
+    assert cnx.getresponse().status == 200
+    assert clock.now == 1005
+    assert scheduler.calls["default"] == 2
+
+
+def test_downloads_are_scheduled_and_retried(scheduler, clock, monkeypatch):
+    download = http_response(200)
+    download.raw = io.BytesIO(b"archive")
+    session = FakeSession([http_response(429, **{"Retry-After": "5"}), download])
+    monkeypatch.setattr(GithubConnection, "session", session)
+    monkeypatch.setattr(GithubConnection, "scheduler", scheduler)
+
+    with GithubConnection.stream("https://codeload.github.com/a.tar.gz") as fo:
+        assert fo.read() == b"archive"
+
+    assert clock.now == 1005
+    assert scheduler.calls["default"] == 2
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import (
+    METADATA,
+    SETUP_PY,
+    WORKING_REPO,
+    FakeGithub,
+    install,
+    make_org,
+)
+
+
+def _scan(monkeypatch, inspect, new_releases="{}"):
+    github = FakeGithub()
+    install(monkeypatch, github)
+    org = make_org(github, 150, seed=13)
+    se = ShellExplorer("token", "dev", new_releases, workers=4, inspect=inspect)
+    se.scan_and_commit()
+    return github.api.calls, dict(org.repos[WORKING_REPO].branch_files("dev"))
+
+
+def test_archive_inspection_matches_contents(monkeypatch):
+    contents_calls, contents_files = _scan(monkeypatch, "contents")
+    archive_calls, archive_files = _scan(monkeypatch, "archive")
+
+    assert archive_files == contents_files
+    assert archive_calls["get_contents"] < contents_calls["get_contents"] / 10
+    assert archive_calls["download_archive"] == archive_calls["get_archive_link"]
+    assert archive_calls["download_archive"] > 0
+
+
+def test_only_needed_files_are_read(github):
+    org = make_org(github, 0)
+    shell = org.add_repo(
+        "Foo-Shell-2G", {"shell-definition.yaml": "", "src/main.py": ""}
+    )
+    package = org.add_repo("cloudshell-foo", {"setup.py": ""})
+    files = {f"src/file-{i}.py": "" for i in range(100)}
+    files["src/drivermetadata.xml"] = METADATA.format(name=shell.name, version="3")
+    shell.add_release("1.0.0", datetime(2021, 6, 1), files)
+    package.add_release(
+        "1.0.0",
+        datetime(2021, 6, 1),
+        {"setup.py": SETUP_PY.format(name=package.name, requires=">=2.7")},
+    )
+    se = ShellExplorer("token", "dev", "{}", inspect="archive")
+
+    se.scan_and_commit()
+
+    versions = {
+        repo.name: repo.releases[0].python_version for repo in se._shells | se._packages
+    }
+    assert versions == {shell.name: "PY3", package.name: "PY2PY3"}
+    assert shell.calls["get_contents"] == package.calls["get_contents"] == 0
+
+
+@pytest.mark.parametrize("inspect", ("contents", "archive"))
+def test_missing_metadata_is_py2(github, inspect):
+    org = make_org(github, 0)
+    shell = org.add_repo("Foo-Shell-2G", {"shell-definition.yaml": ""})
+    shell.add_release("1.0.0", datetime(2021, 6, 1))
+    se = ShellExplorer("token", "dev", "{}", inspect=inspect)
+
+    se.scan_and_commit()
+
+    (repo,) = se._shells
+    assert [r.python_version for r in repo.releases] == ["PY2"]
@@ -0,0 +1,236 @@
+from datetime import datetime
+
+import pytest
+
+from scripts.shell_explorer.catalog import dump_catalog
+from scripts.shell_explorer.operations import SerializationOperations
+from scripts.shell_explorer.scan_state import ScanState
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+
+from tests.fake_github import (
+    METADATA,
+    WORKING_REPO,
+    FakeGithub,
+    FakeOrganization,
+    FakeRepo,
+    install,
+    make_org,
+)
+
+SETUP_PY3 = 'setup(name="cloudshell-foo", python_requires="~=3.7")'
+
+
+@pytest.fixture
+def org(github):
+    org = FakeOrganization(github.api)
+    github.orgs[org.login] = org
+    for i in range(20):
+        package = org.add_repo(f"cloudshell-package-{i}", {"setup.py": SETUP_PY3})
+        shell = org.add_repo(
+            f"Some-Shell-2G-{i}", {"shell-definition.yaml": "", "src/main.py": ""}
+        )
+        other = org.add_repo(f"unrelated-{i}", {"README.md": ""})
+        for day, tag in enumerate(("1.0.0", "1.1.0", "1.2.0"), 1):
+            published_at = datetime(2021, 1, day)
+            package.add_release(tag, published_at)
+            shell_files = {"shell-definition.yaml": ""}
+            if tag == "1.2.0":
+                shell_files["src/drivermetadata.xml"] = METADATA.format(
+                    name=shell.name, version="3"
+                )
+            shell.add_release(tag, published_at, shell_files)
+            other.add_release(tag, published_at)
+    working_repo = org.add_repo(WORKING_REPO)
+    working_repo.create_branch("dev", {"shells.yaml": "[]\n", "packages.yaml": "[]\n"})
+    return org
+
+
+def _scan(org, workers=1, rescan_all=False, layout="single"):
+    se = ShellExplorer(
+        "token", "dev", "{}", workers=workers, rescan_all=rescan_all, layout=layout
+    )
+    se.scan_and_commit()
+    return dict(org.repos[WORKING_REPO].branch_files("dev"))
+
+
+@pytest.fixture
+def working_reads(monkeypatch):
+    reads = []
+    get_contents = FakeRepo.get_contents
+
+    def tracked_get_contents(self, path, ref=None):
+        if self.name == WORKING_REPO:
+            reads.append(path)
+        return get_contents(self, path, ref)
+
+    monkeypatch.setattr(FakeRepo, "get_contents", tracked_get_contents)
+    return reads
+
+
+@pytest.mark.parametrize("workers", (2, 8))
+def test_parallel_scan_matches_serial(monkeypatch, workers):
+    results = []
+    for scan_workers in (1, workers):
+        github = FakeGithub()
+        install(monkeypatch, github)
+        results.append(_scan(make_org(github, 300, seed=7), scan_workers))
+
+    assert results[0] == results[1]
+    assert len(SerializationOperations.load_table(results[0]["shells.yaml"])) > 10
+
+
+def test_scan_results(org):
+    files = _scan(org, 4)
+    shells = SerializationOperations.load_table(files["shells.yaml"])
+    packages = SerializationOperations.load_table(files["packages.yaml"])
+
+    assert len(shells) == 20
+    assert len(packages) == 20
+    assert {r.python_version for r in shells[0].releases} == {"PY2", "PY3"}
+    assert [r.python_version for r in packages[0].releases] == ["PY3"]
+    assert packages[0].releases[0].tag_name == "1.2.0"
+
+
+def test_catalog_is_published_with_tables(org):
+    files = _scan(org)
+
+    assert files["catalog.jsonl"] == dump_catalog(
+        SerializationOperations.load_table(files["shells.yaml"])
+        + SerializationOperations.load_table(files["packages.yaml"])
+    )
+
+
+def test_unchanged_repos_are_skipped(org):
+    first = _scan(org)
+    pushed = org.repos["cloudshell-package-0"]
+    pushed.pushed_at = datetime(2021, 3, 1)
+    for repo in org.repos.values():
+        repo.calls.clear()
+
+    second = _scan(org)
+
+    explored = [r.name for r in org.repos.values() if r.calls["get_releases"]]
+    assert explored == [pushed.name]
+    assert second == first | {"scan_state.yaml": second["scan_state.yaml"]}
+    state = ScanState.load(second["scan_state.yaml"])
+    assert state.get(pushed.name) == {
+        "pushed_at": datetime(2021, 3, 1),
+        "release_id": pushed.releases[0].id,
+        "type": "!Package",
+        "tree_sha": None,
+    }
+    assert state.get("unrelated-0")["type"] is None
+    assert state.get("unrelated-0")["tree_sha"]
+
+
+def test_unclassified_repos_are_revalidated_by_root_tree(org):
+    _scan(org)
+    unchanged, changed = org.repos["unrelated-0"], org.repos["unrelated-1"]
+    for repo in (unchanged, changed):
+        repo.pushed_at = datetime(2021, 3, 1)
+        repo.calls.clear()
+    # a new tag doesn't change the default branch, a new file in the root does
+    unchanged.add_release("2.0.0", datetime(2021, 3, 1))
+    changed.add_release("2.0.0", datetime(2021, 3, 1))
+    changed.branch_files("master")["shell-definition.yaml"] = ""
+
+    files = _scan(org)
+
+    assert unchanged.calls == {"get_git_tree": 1}
+    assert changed.calls["get_git_tree"] == 1
+    assert changed.calls["get_releases"] == 1
+    state = ScanState.load(files["scan_state.yaml"])
+    assert state.get(unchanged.name)["pushed_at"] == datetime(2021, 3, 1)
+    assert state.get(changed.name)["type"] == "!Shell_2G"
+    assert state.get(changed.name)["tree_sha"] is None
+    shells = SerializationOperations.load_table(files["shells.yaml"])
+    assert changed.name in {shell.name for shell in shells}
+
+
+def test_unchanged_tables_are_not_saved(org, monkeypatch):
+    dumped = []
+    dump_table = SerializationOperations.dump_table
+    monkeypatch.setattr(
+        SerializationOperations,
+        "dump_table",
+        lambda table: dumped.append(table) or dump_table(table),
+    )
+    first = _scan(org)
+    assert len(dumped) == 2
+
+    # a push without new releases changes only the scan state
+    dumped.clear()
+    org.repos["cloudshell-package-0"].pushed_at = datetime(2021, 3, 1)
+    second = _scan(org)
+    assert dumped == []
+    assert second == first | {"scan_state.yaml": second["scan_state.yaml"]}
+
+    working_repo = org.repos[WORKING_REPO]
+    working_repo.calls.clear()
+    assert _scan(org) == second
+    assert dumped == []
+    assert working_repo.calls["get_git_tree"] == 0
+    assert working_repo.calls["create_git_commit"] == 0
+
+
+def test_sharded_layout_matches_single_files(github, monkeypatch):
+    results = []
+    for layout in ("single", "sharded"):
+        github.orgs.clear()
+        results.append(_scan(make_org(github, 300, seed=5), 4, layout=layout))
+    single, sharded = results
+
+    for file_name in ("shells.yaml", "packages.yaml", "catalog.jsonl"):
+        assert sharded[file_name] == single[file_name]
+    manifest = SerializationOperations.load_manifest(sharded["shards/manifest.yaml"])
+    repos = SerializationOperations.load_table(single["shells.yaml"])
+    repos += SerializationOperations.load_table(single["packages.yaml"])
+    assert manifest == {repo.name: repo.yaml_tag for repo in repos}
+    for repo in repos:
+        assert sharded[f"shards/{repo.name}.yaml"] == (
+            SerializationOperations.dump_shard(repo)
+        )
+
+
+def test_only_changed_shards_are_read_and_written(org, working_reads):
+    first = _scan(org, layout="sharded")
+    package = org.repos["cloudshell-package-3"]
+    package.add_release("2.0.0", datetime(2021, 2, 1))
+    working_reads.clear()
+
+    second = _scan(org, layout="sharded")
+
+    assert working_reads == [
+        "shards/manifest.yaml",
+        "scan_state.yaml",
+        "shards/cloudshell-package-3.yaml",
+        "feed/index.json",
+        "feed/0000000001.jsonl",
+        "packages.yaml",
+        "catalog.jsonl",
+    ]
+    changed = {path for path in second if second[path] != first.get(path)}
+    assert changed == {
+        "shards/cloudshell-package-3.yaml",
+        "packages.yaml",
+        "catalog.jsonl",
+        "scan_state.yaml",
+        "feed/index.json",
+        "feed/0000000001.jsonl",
+    }
+    packages = SerializationOperations.load_table(second["packages.yaml"])
+    assert {p.name: p for p in packages}[package.name].releases[0].tag_name == "2.0.0"
+    assert second["catalog.jsonl"] == dump_catalog(
+        SerializationOperations.load_table(second["shells.yaml"]) + packages
+    )
+
+
+def test_rescan_all_ignores_scan_state(org):
+    _scan(org)
+    _scan(org, rescan_all=True)
+
+    assert all(
+        r.calls["get_releases"] == 2
+        for r in org.repos.values()
+        if r.name != WORKING_REPO
+    )
@@ -0,0 +1,126 @@
+import io
+import json
+import threading
+
+from scripts.shell_explorer.http_cache import ResponseCache
+from scripts.shell_explorer.rate_limit import RequestScheduler
+from scripts.shell_explorer.tracing import Tracer, trace_repo
+from scripts.shell_explorer.transport import GithubConnection
+
+from tests.conftest import FakeSession, http_response
+
+
+def _get(path):
+    cnx = GithubConnection("api.github.com")
+    cnx.request("GET", path, None, {"Authorization": "token t"})
+    return cnx.getresponse()
+
+
+def test_calls_are_attributed_to_repo_phase_and_cache(tmp_path, monkeypatch):
+    tracer = Tracer()
+    scheduler = RequestScheduler()
+    session = FakeSession(
+        [
+            http_response(200, b'{"name": "a"}', ETag='"v1"'),
+            http_response(200, b"[]"),
+            http_response(404, b"{}"),
+        ]
+    )
+    monkeypatch.setattr(GithubConnection, "session", session)
+    monkeypatch.setattr(GithubConnection, "cache", ResponseCache(str(tmp_path)))
+    monkeypatch.setattr(GithubConnection, "scheduler", scheduler)
+    monkeypatch.setattr(GithubConnection, "tracer", tracer)
+
+    with scheduler.use_phase("explore"), trace_repo("Cisco-IOS-Shell-2G"):
+        _get("/repos/QualiSystems/Cisco-IOS-Shell-2G")
+        _get("/repos/QualiSystems/Cisco-IOS-Shell-2G/releases?per_page=30")
+    _get("/repos/QualiSystems/missing")
+
+    assert [(r["path"], r["status"], r["cache"]) for r in tracer.records] == [
+        ("/repos/QualiSystems/Cisco-IOS-Shell-2G", 200, "miss"),
+        ("/repos/QualiSystems/Cisco-IOS-Shell-2G/releases", 200, "miss"),
+        ("/repos/QualiSystems/missing", 404, "miss"),
+    ]
+    assert [r["repo"] for r in tracer.records] == ["Cisco-IOS-Shell-2G"] * 2 + [None]
+    assert [r["phase"] for r in tracer.records] == ["explore", "explore", "default"]
+    assert tracer.records[0]["bytes"] == len(b'{"name": "a"}')
+
+
+def test_revalidated_calls_are_cache_hits(tmp_path, monkeypatch):
+    tracer = Tracer()
+    session = FakeSession(
+        [http_response(200, b"[]", ETag='"v1"'), http_response(304, b"", ETag='"v1"')]
+    )
+    monkeypatch.setattr(GithubConnection, "session", session)
+    monkeypatch.setattr(GithubConnection, "cache", ResponseCache(str(tmp_path)))
+    monkeypatch.setattr(GithubConnection, "scheduler", None)
+    monkeypatch.setattr(GithubConnection, "tracer", tracer)
+
+    _get("/orgs/QualiSystems/repos")
+    _get("/orgs/QualiSystems/repos")
+
+    assert [r["cache"] for r in tracer.records] == ["miss", "hit"]
+    assert tracer.summary()["cache"] == {"miss": 1, "hit": 1}
+
+
+def test_downloads_are_traced_with_bytes_read(monkeypatch):
+    tracer = Tracer()
+    download = http_response(200)
+    download.raw = io.BytesIO(b"x" * 100)
+    monkeypatch.setattr(GithubConnection, "session", FakeSession([download]))
+    monkeypatch.setattr(GithubConnection, "scheduler", None)
+    monkeypatch.setattr(GithubConnection, "tracer", tracer)
+
+    with trace_repo("Cisco-IOS-Shell-2G"):
+        with GithubConnection.stream("https://codeload.github.com/a.tar.gz") as fo:
+            assert fo.read(40) == b"x" * 40
+
+    assert [(r["path"], r["repo"], r["bytes"]) for r in tracer.records] == [
+        ("/a.tar.gz", "Cisco-IOS-Shell-2G", 40)
+    ]
+
+
+def test_repo_attribution_is_per_thread():
+    tracer = Tracer()
+
+    def explore(name):
+        with trace_repo(name):
+            tracer.record(
+                "GET", f"https://api.github.com/repos/{name}", 200, 0.1, 2, "-", None
+            )
+
+    threads = [threading.Thread(target=explore, args=(f"repo-{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(r["repo"] for r in tracer.records) == [f"repo-{i}" for i in range(8)]
+    assert all(r["path"] == f"/repos/{r['repo']}" for r in tracer.records)
+
+
+def test_summary_and_dump(tmp_path):
+    tracer = Tracer()
+    with trace_repo("slow"):
+        tracer.record(
+            "GET", "https://api.github.com/a", 200, 2.0, 100, "miss", "explore"
+        )
+        tracer.record("GET", "https://api.github.com/b", 200, 1.0, 50, "hit", "explore")
+    with trace_repo("fast"):
+        tracer.record("GET", "https://api.github.com/c", 200, 0.5, 10, "-", "explore")
+    tracer.record("POST", "https://api.github.com/d", 201, 0.1, 1, "-", "commit")
+
+    summary = tracer.summary(top=1)
+
+    assert summary["calls"] == 4
+    assert summary["phases"] == {
+        "explore": {"calls": 3, "time_ms": 3500.0, "bytes": 160},
+        "commit": {"calls": 1, "time_ms": 100.0, "bytes": 1},
+    }
+    assert summary["top_repos"] == {"slow": {"calls": 2, "time_ms": 3000.0}}
+
+    trace_file = tmp_path / "trace.json"
+    tracer.dump(str(trace_file))
+    data = json.loads(trace_file.read_text())
+    assert data["summary"]["calls"] == 4
+    assert [c["path"] for c in data["calls"]] == ["/a", "/b", "/c", "/d"]
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+
+from scripts.shell_explorer.operations import RepoOperations
+from scripts.shell_explorer.tracing import _current_repo, trace_repo
+from scripts.shell_explorer.transport import AsyncRunner, GithubConnection
+
+from tests.conftest import FakeSession, http_response
+
+
+def test_calls_run_concurrently_up_to_the_limit():
+    runner = AsyncRunner(3)
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def call(i):
+        with lock:
+            running.append(i)
+            peak.append(len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(i)
+        return i * 2
+
+    async def main():
+        return await asyncio.gather(*(runner.call(call, i) for i in range(10)))
+
+    assert asyncio.run(main()) == [i * 2 for i in range(10)]
+    assert max(peak) == 3
+
+
+def test_calls_keep_the_context_of_the_task():
+    runner = AsyncRunner(2)
+
+    async def inspect(name):
+        with trace_repo(name):
+            await asyncio.sleep(0)
+            return await runner.call(_current_repo.get)
+
+    async def main():
+        return await asyncio.gather(*(inspect(f"repo-{i}") for i in range(5)))
+
+    assert asyncio.run(main()) == [f"repo-{i}" for i in range(5)]
+
+
+def test_clients_keep_their_own_connection_state(monkeypatch):
+    session = FakeSession([http_response(200, b'{"login": "a"}') for _ in range(3)])
+    monkeypatch.setattr(GithubConnection, "session", session)
+    first = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+    second = RepoOperations("token", "QualiSystems", "Shell-Explorer")
+
+    with first.scheduler.use_phase("explore"):
+        first._github.get_user("a")
+    second._github.get_user("a")
+    second._github.get_user("a")
+
+    assert [r["phase"] for r in first.tracer.records] == ["explore"]
+    assert [r["phase"] for r in second.tracer.records] == ["default", "default"]
+
+
+class EchoSession:
+    # answers with the login from the URL
+    def request(self, verb, url, headers=None, **kwargs):
+        login = url.rsplit("/", 1)[-1]
+        return http_response(200, json.dumps({"login": login}).encode())
+
+
+def test_concurrent_calls_get_their_own_responses(monkeypatch):
+    # PyGithub sets the request on the connection and then reads the response,
+    # the pause between them lets the other worker threads run in the middle
+    request = GithubConnection.request
+
+    def slow_request(self, *args, **kwargs):
+        request(self, *args, **kwargs)
+        time.sleep(0.005)
+
+    monkeypatch.setattr(GithubConnection, "request", slow_request)
+    monkeypatch.setattr(GithubConnection, "session", EchoSession())
+    operations = RepoOperations("token", "QualiSystems", "Shell-Explorer", pool_size=8)
+    logins = [f"user-{i}" for i in range(40)]
+
+    async def main():
+        get_user = operations._github.get_user
+        return await asyncio.gather(
+            *(operations.runner.call(get_user, login) for login in logins)
+        )
+
+    assert [user.login for user in asyncio.run(main())] == logins
+    operations.close()
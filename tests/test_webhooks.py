@@ -0,0 +1,226 @@
+import gc
+import json
+import threading
+import urllib.error
+import urllib.request
+import weakref
+from datetime import datetime
+
+import pytest
+
+from scripts.shell_explorer.operations import SerializationOperations
+from scripts.shell_explorer.shell_explorer import ShellExplorer
+from scripts.shell_explorer.webhooks import (
+    ReleaseBatcher,
+    WebhookServer,
+    sign_payload,
+    verify_signature,
+)
+
+from tests.fake_github import WORKING_REPO, make_org
+
+SECRET = "It's a Secret to Everybody"
+
+
+def _release_payload(repo_name, release_id, action="published", org="QualiSystems"):
+    # the part of a recorded "release" webhook payload
+    return {
+        "action": action,
+        "release": {
+            "id": release_id,
+            "tag_name": "1.2.0",
+            "name": "1.2.0",
+            "draft": False,
+            "prerelease": False,
+            "published_at": "2021-06-02T10:00:00Z",
+            "html_url": f"https://github.com/{org}/{repo_name}/releases/1.2.0",
+        },
+        "repository": {
+            "name": repo_name,
+            "full_name": f"{org}/{repo_name}",
+            "owner": {"login": org, "type": "Organization"},
+        },
+        "organization": {"login": org},
+        "sender": {"login": "qualisystems-bot"},
+    }
+
+
+class Explorations:
+    def __init__(self, explore=None):
+        self.batches = []
+        self.done = threading.Event()
+        self._explore = explore
+
+    def __call__(self, new_releases):
+        self.batches.append(new_releases)
+        if self._explore:
+            self._explore(new_releases)
+        self.done.set()
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def start(explore, debounce=0.2, max_delay=5.0, orgs=("QualiSystems",)):
+        batcher = ReleaseBatcher(explore, debounce, max_delay)
+        webhook_server = WebhookServer(("127.0.0.1", 0), SECRET, batcher, orgs)
+        thread = threading.Thread(target=webhook_server.serve, daemon=True)
+        thread.start()
+        servers.append((webhook_server, thread))
+        return webhook_server
+
+    yield start
+    for webhook_server, thread in servers:
+        webhook_server.shutdown()
+        thread.join()
+
+
+def _post(server, payload, event="release", secret=SECRET):
+    body = json.dumps(payload).encode()
+    host, port = server.server_address
+    request = urllib.request.Request(
+        f"http://{host}:{port}/",
+        data=body,
+        headers={
+            "Content-Type": "application/json",
+            "X-GitHub-Event": event,
+            "X-Hub-Signature-256": sign_payload(secret, body),
+        },
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_signature():
+    # the example from the GitHub webhook documentation
+    signature = (
+        "sha256=757107ea0eb2509fc211221cce984b8a37570b6d7586c22c46f4379c8b043e17"
+    )
+
+    assert sign_payload(SECRET, b"Hello, World!") == signature
+    assert verify_signature(SECRET, b"Hello, World!", signature)
+    assert not verify_signature(SECRET, b"Hello, World?", signature)
+    assert not verify_signature(SECRET, b"Hello, World!", None)
+
+
+def test_burst_of_releases_is_explored_at_once(server):
+    explorations = Explorations()
+    webhook_server = server(explorations)
+
+    assert _post(webhook_server, _release_payload("Foo-Shell-2G", 1)) == 202
+    assert _post(webhook_server, _release_payload("cloudshell-foo", 2)) == 202
+    assert _post(webhook_server, _release_payload("Foo-Shell-2G", 3)) == 202
+    assert _post(webhook_server, _release_payload("Foo-Shell-2G", 3)) == 202
+
+    assert explorations.done.wait(5)
+    assert explorations.batches == [{"Foo-Shell-2G": [1, 3], "cloudshell-foo": [2]}]
+
+
+def test_invalid_and_other_events_are_ignored(server):
+    explorations = Explorations()
+    webhook_server = server(explorations)
+
+    payload = _release_payload("Foo-Shell-2G", 1)
+    assert _post(webhook_server, payload, secret="wrong") == 401
+    assert _post(webhook_server, {"zen": "Keep it simple"}, event="ping") == 204
+    assert _post(webhook_server, _release_payload("Foo-Shell-2G", 2, "edited")) == 204
+    assert _post(webhook_server, {"action": "published"}) == 400
+
+    webhook_server.shutdown()
+    assert explorations.batches == []
+
+
+def test_releases_of_other_orgs_are_keyed_by_full_name(server):
+    explorations = Explorations()
+    webhook_server = server(explorations, orgs=("QualiSystems", "QualiLabs"))
+
+    assert _post(webhook_server, _release_payload("Foo-Shell-2G", 1)) == 202
+    payload = _release_payload("Bar-Shell-2G", 2, org="QualiLabs")
+    assert _post(webhook_server, payload) == 202
+    payload = _release_payload("Baz-Shell-2G", 3, org="Someone")
+    assert _post(webhook_server, payload) == 204
+
+    assert explorations.done.wait(5)
+    assert explorations.batches == [
+        {"Foo-Shell-2G": [1], "QualiLabs/Bar-Shell-2G": [2]}
+    ]
+
+
+def test_pending_releases_are_explored_on_shutdown():
+    explorations = Explorations()
+    batcher = ReleaseBatcher(explorations, debounce=60)
+    batcher.start()
+    batcher.add("Foo-Shell-2G", 1)
+
+    batcher.stop()
+
+    assert explorations.batches == [{"Foo-Shell-2G": [1]}]
+
+
+def test_failed_batch_is_explored_with_the_next_one():
+    batches = []
+    failed = threading.Event()
+    explored = threading.Event()
+
+    def explore(new_releases):
+        batches.append(new_releases)
+        if not failed.is_set():
+            failed.set()
+            raise RuntimeError("GitHub is down")
+        explored.set()
+
+    batcher = ReleaseBatcher(explore, debounce=0.1)
+    batcher.start()
+    batcher.add("Foo-Shell-2G", 1)
+    assert failed.wait(5)
+    batcher.add("Foo-Shell-2G", 2)
+    batcher.add("Bar-Shell-2G", 3)
+    assert explored.wait(5)
+    batcher.stop()
+
+    assert batches == [
+        {"Foo-Shell-2G": [1]},
+        {"Foo-Shell-2G": [1, 2], "Bar-Shell-2G": [3]},
+    ]
+
+
+def test_explorer_is_released_after_the_batch(github):
+    make_org(github, 10, seed=1)
+    se = ShellExplorer("token", "dev", "{}")
+    se.scan_and_commit()
+    se.close()
+    explorer = weakref.ref(se)
+
+    del se
+    gc.collect()
+
+    assert explorer() is None
+
+
+def test_releases_are_committed(github, server):
+    org = make_org(github, 100, seed=1)
+    packages = [
+        repo for name, repo in org.repos.items() if name.startswith("cloudshell")
+    ]
+    for package in packages[:2]:
+        package.add_release("9.0.0", datetime(2022, 1, 1))
+
+    def explore(new_releases):
+        ShellExplorer("token", "dev", json.dumps(new_releases)).scan_and_commit()
+
+    explorations = Explorations(explore)
+    webhook_server = server(explorations)
+    for package in packages[:2]:
+        payload = _release_payload(package.name, package.releases[0].id)
+        assert _post(webhook_server, payload) == 202
+
+    assert explorations.done.wait(5)
+    files = org.repos[WORKING_REPO].branch_files("dev")
+    table = SerializationOperations.load_table(files["packages.yaml"])
+    assert {p.name: p.releases[0].tag_name for p in table} == {
+        package.name: "9.0.0" for package in packages[:2]
+    }